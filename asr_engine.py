@@ -0,0 +1,206 @@
+import os
+import re
+import subprocess
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# whisper CLI 기본값과 동일하게 맞춰서 subprocess 방식과 같은 전사 결과가 나오도록 함
+WHISPER_CLI_OPTIONS = {
+    'best_of': 5,
+    'temperature': tuple(np.arange(0, 1.0 + 1e-6, 0.2)),
+    'compression_ratio_threshold': 2.4,
+    'logprob_threshold': -1.0,
+    'no_speech_threshold': 0.6,
+}
+DEFAULT_BEAM_SIZE = 5
+
+
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    """ffmpeg로 조각 파일을 16kHz mono float32 배열로 디코딩 (whisper.audio.load_audio와 동일)."""
+    command = [
+        'ffmpeg', '-nostdin', '-threads', '0',
+        '-i', path,
+        '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate),
+        '-',
+    ]
+    out = subprocess.run(command, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def format_timestamp(seconds):
+    """whisper.utils.format_timestamp와 같은 '[hh:]mm:ss.mmm' 형식."""
+    milliseconds = round(seconds * 1000.0)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1_000)
+    hours_marker = f"{hours:02d}:" if hours > 0 else ""
+    return f"{hours_marker}{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+
+def format_transcript(segments, offset=0.0):
+    """whisper CLI가 stdout으로 출력하던 '[mm:ss.mmm --> mm:ss.mmm] text' 형식으로 변환.
+
+    CLI와 같이 괄호 뒤에 공백 한 칸만 붙임 (whisper 구간 text는 보통 공백으로 시작해서 출력에는 두 칸으로 보임).
+    """
+    lines = []
+    for seg in segments:
+        start = format_timestamp(seg['start'] + offset)
+        end = format_timestamp(seg['end'] + offset)
+        lines.append(f"[{start} --> {end}] {seg['text']}")
+    return "\n".join(lines).strip()
+
+
+def parse_transcript(text):
+    """format_transcript의 역변환. 타임스탬프를 떼고 구간별 텍스트만 돌려줌 (txt 파일 재생성용)."""
+    return [{'text': re.sub(r'^\[[^\]]*\]\s?', '', line)} for line in text.splitlines()]
+
+
+def write_txt(segments, name, output_dir):
+    """whisper CLI의 txt writer처럼 output_dir/<name에서 확장자 뺀 이름>.txt 에 구간별 텍스트를 씀."""
+    path = os.path.join(output_dir, os.path.splitext(os.path.basename(name))[0] + '.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        for seg in segments:
+            print(seg['text'].strip(), file=f)
+
+
+class ASREngine(ABC):
+    """ASR 백엔드 공통 인터페이스.
+
+    모델은 생성자에서 한 번만 로드하고, transcribe()는 {'text', 'segments'} 형태의 결과를 반환함.
+    segments의 각 항목은 최소한 'start', 'end', 'text' 키를 가짐.
+    """
+
+    name = None
+
+    def __init__(self, model, device, language='ko', condition_on_previous_text=False, threads=None, beam_size=DEFAULT_BEAM_SIZE):
+        self.model_name = model
+        self.device = device
+        self.language = language
+        self.condition_on_previous_text = condition_on_previous_text
+        self.threads = threads
+        self.beam_size = beam_size
+
+    @abstractmethod
+    def transcribe(self, audio):
+        """audio: 파일 경로 또는 16kHz mono float32 배열 -> {'text', 'segments'}."""
+
+    def transcribe_to_dir(self, audio, name, output_dir):
+        """전사 후 whisper CLI처럼 output_dir/<name>.txt 를 쓰고, stdout 형식의 텍스트를 반환."""
+        result = self.transcribe(audio)
+        write_txt(result['segments'], name, output_dir)
+        return format_transcript(result['segments'])
+
+
+class WhisperEngine(ASREngine):
+    """openai-whisper 백엔드 (GPU 노드의 기존 large 모델)."""
+
+    name = 'whisper'
+
+    def __init__(self, model='large', device='cuda', **kwargs):
+        super().__init__(model, device, **kwargs)
+        import torch
+        import whisper
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        print(f"Loading whisper model '{model}' on {device}...")
+        self.model = whisper.load_model(model, device=device)
+
+    def transcribe(self, audio):
+        """audio: 파일 경로 또는 16kHz mono float32 배열."""
+        return self.model.transcribe(
+            audio,
+            language=self.language,
+            condition_on_previous_text=self.condition_on_previous_text,
+            fp16=self.device != 'cpu',
+            verbose=None,
+            beam_size=self.beam_size,
+            **WHISPER_CLI_OPTIONS,
+        )
+
+
+class FasterWhisperEngine(ASREngine):
+    """faster-whisper(CTranslate2) 백엔드. CPU 노드에서 int8 양자화 모델로 실행."""
+
+    name = 'faster-whisper'
+
+    def __init__(self, model='small', device='cpu', compute_type='int8', **kwargs):
+        super().__init__(model, device, **kwargs)
+        from faster_whisper import WhisperModel
+        self.compute_type = compute_type
+        print(f"Loading faster-whisper model '{model}' on {device} ({compute_type}, {self.threads or 'auto'} threads)...")
+        self.model = WhisperModel(model, device=device, compute_type=compute_type, cpu_threads=self.threads or 0)
+
+    def transcribe(self, audio):
+        segments, _ = self.model.transcribe(
+            audio,
+            language=self.language,
+            condition_on_previous_text=self.condition_on_previous_text,
+            beam_size=self.beam_size,
+            best_of=WHISPER_CLI_OPTIONS['best_of'],
+            temperature=list(WHISPER_CLI_OPTIONS['temperature']),
+            compression_ratio_threshold=WHISPER_CLI_OPTIONS['compression_ratio_threshold'],
+            log_prob_threshold=WHISPER_CLI_OPTIONS['logprob_threshold'],
+            no_speech_threshold=WHISPER_CLI_OPTIONS['no_speech_threshold'],
+        )
+        segments = [{'start': s.start, 'end': s.end, 'text': s.text} for s in segments]
+        return {'text': ''.join(s['text'] for s in segments), 'segments': segments}
+
+
+BACKENDS = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+
+def has_cuda():
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def auto_options(threads=None, cpu_only=False):
+    """하드웨어에 맞는 기본 설정. GPU가 있으면 기존 whisper large, 없으면 코어 수에 맞춘 int8 faster-whisper.
+
+    cpu_only면 CUDA 확인(torch import)을 하지 않고 바로 CPU용 설정을 고름 (fork 전 부모 프로세스에서 사용).
+    """
+    if not cpu_only and has_cuda():
+        return {'backend': 'whisper', 'model': 'large', 'device': 'cuda'}
+    cores = os.cpu_count() or 1
+    if cores >= 16:
+        model = 'medium'
+    elif cores >= 8:
+        model = 'small'
+    else:
+        model = 'base'
+    return {'backend': 'faster-whisper', 'model': model, 'device': 'cpu', 'threads': threads or cores}
+
+
+def resolve_options(backend='auto', model=None, device=None, threads=None, beam_size=None, cpu_only=False, **kwargs):
+    """backend: 'auto' | 'whisper' | 'faster-whisper'. None인 설정은 auto_options의 기본값으로 채움.
+
+    cpu_only: CPU 워커 풀처럼 CPU에서만 실행할 때. auto는 int8 faster-whisper로 정하고 CUDA 확인을 건너뜀.
+    """
+    options = auto_options(threads, cpu_only) if backend == 'auto' else {'backend': backend}
+    if options['backend'] == 'whisper':
+        options.setdefault('model', 'large')
+        options.setdefault('device', 'cpu' if cpu_only or not has_cuda() else 'cuda')
+    else:
+        options.setdefault('model', 'small')
+        options.setdefault('device', 'cpu')
+    for key, value in (('model', model), ('device', device), ('threads', threads), ('beam_size', beam_size)):
+        if value is not None:
+            options[key] = value
+    options.setdefault('beam_size', DEFAULT_BEAM_SIZE)
+    options.update(kwargs)
+    return options
+
+
+def create_engine(**options):
+    options = resolve_options(**options)
+    engine_class = BACKENDS[options.pop('backend')]
+    return engine_class(**options)
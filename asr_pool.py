@@ -0,0 +1,95 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from asr_engine import create_engine, format_transcript, write_txt
+
+SAMPLE_RATE = 16000
+
+# 워커 프로세스마다 한 번만 만드는 엔진 (_init_worker에서 생성)
+_engine = None
+
+
+def split_points(audio, sample_rate=SAMPLE_RATE, max_seconds=60.0, min_seconds=10.0, frame_seconds=0.02, smooth_seconds=0.2):
+    """긴 오디오를 max_seconds 이하 조각으로 나눌 sample 위치 목록.
+
+    각 조각의 [min_seconds, max_seconds] 범위 안에서 에너지가 가장 낮은 지점(말 사이의 쉼)에서 자름.
+    """
+    frame = int(sample_rate * frame_seconds)
+    n = len(audio) // frame
+    max_f = int(max_seconds / frame_seconds)
+    min_f = min(int(min_seconds / frame_seconds), max_f - 1)
+    if n <= max_f:
+        return []
+    frames = np.asarray(audio[:n * frame], dtype=np.float32).reshape(n, frame)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    kernel = max(int(smooth_seconds / frame_seconds), 1)
+    energy = np.convolve(energy, np.ones(kernel) / kernel, mode='same')
+
+    cuts = []
+    pos = 0
+    while n - pos > max_f:
+        window = energy[pos + min_f:pos + max_f]
+        pos = pos + min_f + int(np.argmin(window))
+        cuts.append(pos * frame)
+    return cuts
+
+
+def _init_worker(engine_options):
+    global _engine
+    _engine = create_engine(**engine_options)
+
+
+def _transcribe_piece(audio):
+    result = _engine.transcribe(audio)
+    return [{'start': s['start'], 'end': s['end'], 'text': s['text']} for s in result['segments']]
+
+
+class PendingTranscript:
+    """한 행의 조각들이 모두 끝나면 시간 오프셋을 맞춰서 하나의 Transcript로 합침."""
+
+    def __init__(self, pieces, name, output_dir):
+        self.pieces = pieces
+        self.name = name
+        self.output_dir = output_dir
+
+    def result(self):
+        segments = []
+        for offset, future in self.pieces:
+            for seg in future.result():
+                segments.append({'start': seg['start'] + offset, 'end': seg['end'] + offset, 'text': seg['text']})
+        write_txt(segments, self.name, self.output_dir)
+        return format_transcript(segments)
+
+
+class EnginePool:
+    """CPU 워커 프로세스 풀. 워커마다 모델을 한 번만 로드하고, 긴 구간은 쉼 지점에서 나눠서 병렬 전사.
+
+    engine_options는 asr_engine.create_engine 인자. 스레드 수는 코어를 워커끼리 나눠 갖도록 덮어씀.
+    """
+
+    def __init__(self, workers, engine_options, max_piece_seconds=60.0, min_piece_seconds=10.0):
+        engine_options = dict(engine_options, threads=max((os.cpu_count() or 1) // workers, 1))
+        self.max_piece_seconds = max_piece_seconds
+        self.min_piece_seconds = min_piece_seconds
+        # make_piece.py는 모듈 최상위에서 실행되는 스크립트라 spawn으로는 다시 import할 수 없어서 fork 사용.
+        # prefetch 스레드가 돌기 전에 워커를 모두 띄워두려고 바로 빈 작업을 하나 제출함.
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker, initargs=(engine_options,)
+        )
+        self.executor.submit(int)
+
+    def submit(self, audio, name, output_dir):
+        cuts = split_points(audio, SAMPLE_RATE, self.max_piece_seconds, self.min_piece_seconds)
+        bounds = [0] + cuts + [len(audio)]
+        pieces = [
+            (bounds[i] / SAMPLE_RATE, self.executor.submit(_transcribe_piece, audio[bounds[i]:bounds[i + 1]]))
+            for i in range(len(bounds) - 1)
+        ]
+        return PendingTranscript(pieces, name, output_dir)
+
+    def shutdown(self):
+        self.executor.shutdown()
@@ -0,0 +1,57 @@
+import time
+import argparse
+
+from asr_engine import BACKENDS, create_engine
+from pcm_cache import PcmCache, build_pcm_cache
+
+# 같은 방송 구간을 각 ASR 백엔드로 전사해서 real-time factor(처리 시간 / 오디오 길이)를 비교함.
+# 예: python benchmark_asr.py --mp3_file /home/dnlab/input/250510/mbc-1400.mp3 --duration 600
+
+
+def run_backend(backend, audio, audio_seconds, args):
+    load_start = time.perf_counter()
+    engine = create_engine(
+        backend=backend, model=args.model.get(backend), device=args.device, threads=args.threads, beam_size=args.beam_size,
+        language='ko', condition_on_previous_text=False,
+    )
+    load_time = time.perf_counter() - load_start
+
+    start = time.perf_counter()
+    result = engine.transcribe(audio)
+    elapsed = time.perf_counter() - start
+    return {
+        'backend': backend,
+        'model': engine.model_name,
+        'device': engine.device,
+        'load': load_time,
+        'elapsed': elapsed,
+        'rtf': elapsed / audio_seconds,
+        'chars': len(result['text'].strip()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report the real-time factor of each ASR backend on the same broadcast.')
+    parser.add_argument('--mp3_file', required=True, help='Broadcast mp3 to transcribe.')
+    parser.add_argument('--pcm_cache', default=None, help='PCM cache path (default: <mp3>.16k.wav, built if missing).')
+    parser.add_argument('--offset', type=float, default=0.0, help='Start of the benchmarked range in seconds.')
+    parser.add_argument('--duration', type=float, default=600.0, help='Length of the benchmarked range in seconds.')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS), help='Backends to compare.')
+    parser.add_argument('--whisper_model', default=None, help='Model for the whisper backend (default: large).')
+    parser.add_argument('--faster_whisper_model', default=None, help='Model for the faster-whisper backend (default: small).')
+    parser.add_argument('--device', default=None, help='Force a device for every backend.')
+    parser.add_argument('--threads', type=int, default=None, help='CPU threads per backend.')
+    parser.add_argument('--beam_size', type=int, default=None, help='Beam size (default 5).')
+    args = parser.parse_args()
+    args.model = {'whisper': args.whisper_model, 'faster-whisper': args.faster_whisper_model}
+
+    pcm = PcmCache(build_pcm_cache(args.mp3_file, args.pcm_cache))
+    audio = pcm.read_float(args.offset, args.offset + args.duration)
+    audio_seconds = len(audio) / pcm.sample_rate
+    print(f"Benchmarking {audio_seconds:.1f}s of {args.mp3_file}")
+
+    results = [run_backend(backend, audio, audio_seconds, args) for backend in args.backends]
+
+    print(f"{'backend':<16}{'model':<10}{'device':<8}{'load(s)':>10}{'asr(s)':>10}{'RTF':>8}{'chars':>8}")
+    for r in results:
+        print(f"{r['backend']:<16}{r['model']:<10}{r['device']:<8}{r['load']:>10.1f}{r['elapsed']:>10.1f}{r['rtf']:>8.3f}{r['chars']:>8}")
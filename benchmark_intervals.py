@@ -0,0 +1,182 @@
+import io
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import intervals
+from timeline import Timeline
+
+# intervals.py(timeline.Timeline 벡터 연산)와 예전 행 단위(df.iloc) 구현을 합성 24시간 세그먼트 결과로 비교함.
+# 두 구현의 출력 CSV가 byte 단위로 같은지도 확인. 입력은 ina CSV처럼 텍스트로 한 번 쓴 뒤 각자 방식으로 다시 읽음.
+# 예: python benchmark_intervals.py --rows 120000 --times frames
+
+
+def synthetic_segmentation(rows, hours=24.0, seed=0, frames=True):
+    """ina_speech_segmenter -r 0.02 결과 비슷한 labels/start/stop 표. 길이 0인 행도 일부 섞음.
+
+    frames=True면 ina처럼 frame 번호 * 0.02를 반올림 없이 씀 (689.5600000000001 같은 값이 섞임).
+    False면 소수 둘째 자리로 반올림한 값.
+    """
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(['speech', 'music', 'noEnergy', 'noise', 'speech', 'music'], size=rows)
+    durations = rng.exponential(1.0, size=rows)
+    durations[rng.random(rows) < 0.002] = 0.0
+    durations *= hours * 3600 / durations.sum()
+    if frames:
+        bounds = np.concatenate([[0], np.cumsum(np.round(durations / 0.02).astype(np.int64))]) * 0.02
+    else:
+        bounds = np.round(np.concatenate([[0.0], np.cumsum(durations)]), 2)
+    return pd.DataFrame({'labels': labels, 'start': bounds[:-1], 'stop': bounds[1:]})
+
+
+# ---- 예전 행 단위 구현 (remove-noenergy.py / modify-script.py) ----
+
+def legacy_merge_no_energy_first(df):
+    merged_data = []
+    i = 0
+    while i < len(df):
+        current_row = df.iloc[i].copy()
+        if current_row['labels'] == 'noEnergy' or current_row['labels'] == 'noise':
+            if i < len(df) - 1:
+                next_row = df.iloc[i + 1].copy()
+                next_row['start'] = current_row['start']
+                merged_data.append(next_row)
+                i += 2
+            else:
+                merged_data.append(current_row)
+                i += 1
+        else:
+            merged_data.append(current_row)
+            i += 1
+    return pd.DataFrame(merged_data)
+
+
+def legacy_merge_rows(df):
+    merged_data = []
+    current_row = df.iloc[0].copy()
+    for i in range(1, len(df)):
+        next_row = df.iloc[i]
+        if current_row['stop'] - current_row['start'] <= 0:
+            if current_row['labels'] != next_row['labels']:
+                continue
+            current_row['stop'] = max(current_row['stop'], next_row['stop'])
+            current_row['labels'] = next_row['labels']
+        else:
+            merged_data.append(current_row.copy())
+            current_row = next_row.copy()
+    merged_data.append(current_row)
+    return pd.DataFrame(merged_data)
+
+
+def legacy_merge_play_segments(df):
+    if df.empty:
+        return df
+    merged = []
+    prev = df.iloc[0].copy()
+    for i in range(1, len(df)):
+        curr = df.iloc[i]
+        if prev['labels'] == 'play' and curr['labels'] == 'play' and (curr['start'] - prev['stop']) < 240:
+            prev['stop'] = curr['stop']
+        else:
+            merged.append(prev)
+            prev = curr.copy()
+    merged.append(prev)
+    return pd.DataFrame(merged)
+
+
+def legacy_play_segments(df):
+    merged_segments = []
+    play_candidates = []
+    n = len(df)
+    i = 0
+    while i < n:
+        row = df.iloc[i]
+        if row['labels'] == 'speech':
+            start = row['start']
+            stop = row['stop']
+            j = i + 1
+            while j < n and df.iloc[j]['labels'] in ['speech', 'noEnergy', 'noise']:
+                stop = df.iloc[j]['stop']
+                j += 1
+            merged_segments.append({'labels': 'speech', 'start': start, 'stop': stop})
+            i = j
+        elif row['labels'] == 'music':
+            block_start = row['start']
+            block_stop = row['stop']
+            j = i + 1
+            while j < n and df.iloc[j]['labels'] in ['music', 'noEnergy', 'noise']:
+                block_stop = df.iloc[j]['stop']
+                j += 1
+            if block_stop - block_start >= 60:
+                play_candidates.append({'start': block_start, 'stop': block_stop})
+            else:
+                merged_segments.append({'labels': 'music', 'start': block_start, 'stop': block_stop})
+            i = j
+        else:
+            i += 1
+    play_candidates = sorted(play_candidates, key=lambda x: x['start'])
+    valid_play = []
+    for idx, block in enumerate(play_candidates):
+        prev_stop = play_candidates[idx-1]['stop'] if idx > 0 else None
+        next_start = play_candidates[idx+1]['start'] if idx < len(play_candidates)-1 else None
+        prev_ok = (prev_stop is None) or (block['start'] - prev_stop >= 100)
+        next_ok = (next_start is None) or (next_start - block['stop'] >= 100)
+        if prev_ok and next_ok:
+            valid_play.append(block)
+        else:
+            merged_segments.append({'labels': 'music', 'start': block['start'], 'stop': block['stop']})
+    for block in valid_play:
+        merged_segments.append({'labels': 'play', 'start': block['start'], 'stop': block['stop']})
+    final_df = pd.DataFrame(merged_segments).sort_values('start').reset_index(drop=True)
+    return legacy_merge_play_segments(final_df)
+
+
+def to_csv(result):
+    if isinstance(result, Timeline):
+        buf = io.StringIO()
+        result.write_csv(buf)
+        return buf.getvalue()
+    return result.to_csv(index=False)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the vectorized interval merges against the row-by-row implementation.')
+    parser.add_argument('--rows', type=int, default=120000, help='Number of segmenter rows (24 hours).')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--times', choices=['frames', 'rounded'], default='frames', help='frames: unrounded frame*0.02 times like ina output, rounded: times rounded to 0.01 s.')
+    parser.add_argument('--skip_legacy', action='store_true', help='Only time intervals.py (the row-by-row version takes minutes).')
+    args = parser.parse_args()
+
+    # 실제 단계처럼 segmenter TSV를 파일로 쓰고, 예전 구현은 pd.read_csv로, intervals.py는 Timeline.read_csv로 읽음
+    generated = synthetic_segmentation(args.rows, seed=args.seed, frames=args.times == 'frames')
+    with tempfile.TemporaryDirectory() as tmp:
+        tsv_path = os.path.join(tmp, 'segments.csv')
+        generated.to_csv(tsv_path, sep='\t', index=False)
+        df = pd.read_csv(tsv_path, sep='\t')
+        tl = Timeline.read_csv(tsv_path, sep='\t')
+    print(f"{len(df)} rows, {df['stop'].iloc[-1] / 3600:.1f} hours, {args.times} times")
+
+    # modify-script.py도 remove-noenergy 결과가 아니라 ina 원본 CSV를 읽으므로 두 단계 모두 같은 입력을 사용
+    stages = [
+        ('remove-noenergy', lambda d: intervals.merge_rows(intervals.merge_no_energy_first(d)),
+         lambda d: legacy_merge_rows(legacy_merge_no_energy_first(d))),
+        ('modify-script', intervals.play_segments, legacy_play_segments),
+    ]
+    for name, fast, legacy in stages:
+        fast_tl, fast_time = timed(fast, tl)
+        line = f"{name:16s} vectorized {fast_time:8.3f}s ({len(fast_tl)} rows)"
+        if not args.skip_legacy:
+            legacy_df, legacy_time = timed(legacy, df)
+            same = to_csv(fast_tl) == to_csv(legacy_df)
+            line += f" | row-by-row {legacy_time:8.3f}s | x{legacy_time / fast_time:.0f} | identical CSV: {same}"
+        print(line)
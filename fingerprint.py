@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from timeline import SEGMENTS_INFO, Timeline
+
+# 반복되는 징글/스테이션 ID/광고를 찾기 위한 landmark 방식 오디오 지문.
+# 스펙트로그램에서 대역별 peak를 뽑고, peak 쌍 (f1, f2, dt)을 hash로 만들어 SQLite에 저장함.
+# 같은 광고가 다시 나오면 hash들이 일정한 시간 차이(offset)로 많이 일치하는 것으로 찾음.
+
+SAMPLE_RATE = 16000
+N_FFT = 1024
+HOP = 512
+BANDS = [(8, 32), (32, 64), (64, 128), (128, 256), (256, 512)]
+FAN_OUT = 5
+MAX_DT = 63
+FRAME_SECONDS = HOP / SAMPLE_RATE
+
+
+def spectrogram(audio):
+    """16kHz mono float32 -> log magnitude 스펙트로그램 (frames x bins)."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < N_FFT:
+        return np.zeros((0, N_FFT // 2 + 1), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(audio, N_FFT)[::HOP]
+    spec = np.abs(np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=1))
+    return np.log1p(spec).astype(np.float32)
+
+
+def peaks(spec):
+    """프레임마다 각 대역의 최대값 bin을 peak로 사용. 평균보다 약한 peak는 버림."""
+    times, freqs = [], []
+    if len(spec) == 0:
+        return np.array(times, dtype=np.int64), np.array(freqs, dtype=np.int64)
+    threshold = spec.mean()
+    for low, high in BANDS:
+        band = spec[:, low:high]
+        best = band.argmax(axis=1)
+        strong = band[np.arange(len(band)), best] > threshold
+        times.append(np.nonzero(strong)[0])
+        freqs.append(best[strong] + low)
+    times = np.concatenate(times)
+    freqs = np.concatenate(freqs)
+    order = np.lexsort((freqs, times))
+    return times[order], freqs[order]
+
+
+def fingerprint(audio):
+    """[(hash, anchor_frame), ...] 배열 두 개를 반환."""
+    times, freqs = peaks(spectrogram(audio))
+    hashes, anchors = [], []
+    for k in range(1, FAN_OUT + 1):
+        t1, f1 = times[:-k], freqs[:-k]
+        t2, f2 = times[k:], freqs[k:]
+        dt = t2 - t1
+        valid = (dt > 0) & (dt <= MAX_DT)
+        hashes.append((f1[valid] << 16) | (f2[valid] << 6) | dt[valid])
+        anchors.append(t1[valid])
+    if not hashes:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    return np.concatenate(hashes), np.concatenate(anchors)
+
+
+class FingerprintDB:
+    """알려진 징글/광고의 지문, 라벨, 전사 결과를 저장하는 SQLite DB."""
+
+    def __init__(self, path, min_matches=20, min_ratio=0.1, min_coverage=0.8):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.min_matches = min_matches
+        self.min_ratio = min_ratio
+        self.min_coverage = min_coverage
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS items ('
+            'id INTEGER PRIMARY KEY, label TEXT NOT NULL, transcript TEXT NOT NULL, duration REAL NOT NULL, source TEXT)'
+        )
+        self.conn.execute('CREATE TABLE IF NOT EXISTS hashes (hash INTEGER NOT NULL, item_id INTEGER NOT NULL, offset INTEGER NOT NULL)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS hashes_hash ON hashes(hash)')
+        self.conn.commit()
+
+    def add(self, audio, label, transcript, source=''):
+        hashes, anchors = fingerprint(audio)
+        cur = self.conn.execute(
+            'INSERT INTO items (label, transcript, duration, source) VALUES (?, ?, ?, ?)',
+            (label, transcript, len(audio) / SAMPLE_RATE, source),
+        )
+        item_id = cur.lastrowid
+        self.conn.executemany(
+            'INSERT INTO hashes (hash, item_id, offset) VALUES (?, ?, ?)',
+            ((int(h), item_id, int(t)) for h, t in zip(hashes, anchors)),
+        )
+        self.conn.commit()
+        return item_id
+
+    def match(self, audio):
+        """일치하는 항목이 있으면 {'id', 'label', 'transcript', 'score'}, 없으면 None.
+
+        구간 길이와 저장된 항목 길이가 비슷해야(min_coverage) 매칭으로 인정함.
+        긴 speech 구간 안에 짧은 징글이 섞여 있는 경우를 통째로 바꾸지 않기 위함.
+        """
+        hashes, anchors = fingerprint(audio)
+        if len(hashes) == 0:
+            return None
+        anchor_by_hash = {}
+        for h, t in zip(hashes.tolist(), anchors.tolist()):
+            anchor_by_hash.setdefault(h, []).append(t)
+        votes = Counter()
+        keys = list(anchor_by_hash)
+        for i in range(0, len(keys), 900):
+            chunk = keys[i:i + 900]
+            rows = self.conn.execute(
+                f"SELECT hash, item_id, offset FROM hashes WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for h, item_id, offset in rows:
+                for t in anchor_by_hash[h]:
+                    votes[(item_id, offset - t)] += 1
+        if not votes:
+            return None
+        (item_id, _), score = votes.most_common(1)[0]
+        if score < self.min_matches or score / len(hashes) < self.min_ratio:
+            return None
+        label, transcript, duration = self.conn.execute(
+            'SELECT label, transcript, duration FROM items WHERE id = ?', (item_id,)
+        ).fetchone()
+        seconds = len(audio) / SAMPLE_RATE
+        if min(seconds, duration) / max(seconds, duration) < self.min_coverage:
+            return None
+        return {'id': item_id, 'label': label, 'transcript': transcript, 'score': score}
+
+    def close(self):
+        self.conn.close()
+
+
+def mine(db, processed_dirs, min_count=3, max_seconds=90.0, jingle_seconds=15.0):
+    """이전 방송들의 짧은 speech/music 세그먼트 중 여러 방송에서 반복되는 것을 DB에 등록.
+
+    processed_dirs: make_piece.py 결과 디렉토리들 (segments/, transcripts/segments_info.csv 포함).
+    """
+    from asr_engine import load_audio
+
+    candidates = FingerprintDB(':memory:', min_matches=db.min_matches, min_ratio=db.min_ratio, min_coverage=db.min_coverage)
+    counts = Counter()
+    seen_in = {}
+    for processed_dir in processed_dirs:
+        info_csv = os.path.join(processed_dir, 'transcripts', 'segments_info.csv')
+        if not os.path.exists(info_csv):
+            print(f"[skip] {info_csv} not found")
+            continue
+        for row in Timeline.read_csv(info_csv, schema=SEGMENTS_INFO).records():
+            if row.label not in ['speech', 'music'] or row.duration > max_seconds:
+                continue
+            mp3_path = os.path.join(processed_dir, 'segments', row['MP3 File'])
+            if not os.path.exists(mp3_path):
+                continue
+            audio = load_audio(mp3_path)
+            if db.match(audio) is not None:
+                continue
+            found = candidates.match(audio)
+            if found is None:
+                item_id = candidates.add(audio, 'jingle' if len(audio) / SAMPLE_RATE < jingle_seconds else 'ad', row['Transcript'], mp3_path)
+                seen_in[item_id] = {processed_dir}
+                counts[item_id] = 1
+            elif processed_dir not in seen_in[found['id']]:
+                seen_in[found['id']].add(processed_dir)
+                counts[found['id']] += 1
+
+    added = 0
+    for item_id, count in counts.items():
+        if count < min_count:
+            continue
+        label, transcript, source = candidates.conn.execute('SELECT label, transcript, source FROM items WHERE id = ?', (item_id,)).fetchone()
+        db.add(load_audio(source), label, transcript, source)
+        added += 1
+    print(f"Registered {added} recurring segments (seen in >= {min_count} broadcasts)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the jingle/station ID/ad fingerprint database from earlier broadcasts.')
+    parser.add_argument('--db', required=True, help='Fingerprint SQLite path.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = sub.add_parser('add', help='Register one audio file (e.g. a segment mp3) with a label.')
+    add_parser.add_argument('--audio', required=True, help='Audio file of the jingle/ad.')
+    add_parser.add_argument('--label', required=True, help='Tag for matching rows, e.g. ad, jingle, station_id.')
+    add_parser.add_argument('--transcript', default='', help='Transcript to reuse on a match.')
+
+    mine_parser = sub.add_parser('mine', help='Register segments that recur across earlier broadcasts.')
+    mine_parser.add_argument('--processed_dirs', nargs='+', required=True, help='make_piece.py output dirs (<processed>/<date>/<station>-<time>).')
+    mine_parser.add_argument('--min_count', type=int, default=3, help='Minimum number of broadcasts a segment must appear in.')
+    mine_parser.add_argument('--max_seconds', type=float, default=90.0, help='Only segments shorter than this are considered.')
+    args = parser.parse_args()
+
+    db = FingerprintDB(args.db)
+    if args.command == 'add':
+        from asr_engine import load_audio
+        item_id = db.add(load_audio(args.audio), args.label, args.transcript, args.audio)
+        print(f"Added {args.audio} as {args.label} (id {item_id})")
+    else:
+        mine(db, args.processed_dirs, args.min_count, args.max_seconds)
+    db.close()
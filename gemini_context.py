@@ -0,0 +1,159 @@
+import json
+import threading
+from datetime import datetime
+
+# summarize.py에서 매 요청마다 반복되는 요약 지시문을 요청 본문에서 떼어 내서 Gemini 캐시를 쓸 수 있게 함.
+# explicit context cache는 모델의 최소 크기(gemini-2.5-flash는 1024 tokens) 이상인 지시문만 만들 수 있는데,
+# 지금 요약 지시문은 수백 tokens라서 만들지 않고 system_instruction으로 보냄.
+# 한국어/영어 지시문은 token 하나가 글자 하나 이상이라 글자 수가 최소 크기보다 작으면 count_tokens를 부르지 않음.
+# system_instruction은 모든 요청에서 같은 앞부분이라 implicit caching 대상이지만, 이것도 공통 앞부분이 최소 크기를
+# 넘어야 적용되므로 지금 지시문으로는 캐시 적중이 거의 없음.
+# 보고에는 usage_metadata의 cached_content_token_count(실제 캐시 적중)와 함께,
+# 지시문 tokens × 요청 수로 로컬에서 계산한 지시문 tokens와 그중 context cache로 보낸 양(절약 추정)을 같이 남김.
+
+# 모델별 explicit context cache 최소 토큰 수. 목록에 없는 모델은 가장 큰 값으로 가정
+MIN_CACHE_TOKENS = {
+    'gemini-2.5-flash': 1024,
+    'gemini-2.5-pro': 4096,
+}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+
+
+class PromptContextCache:
+    """프롬프트 template의 고정된 앞부분(지시문)을 Gemini cached content 또는 system_instruction으로 보냄.
+
+    template마다 처음 쓰일 때 글자 수로 최소 크기에 못 미치는지 보고, 넘을 수 있으면 count_tokens로 확인해서
+    MIN_CACHE_TOKENS 이상일 때만 caches.create를 호출함.
+    작거나 확인/생성에 실패하면 system_instruction으로 보냄 (implicit caching 대상, 요청 본문에는 전사만 들어감).
+    """
+
+    def __init__(self, client, model, ttl_seconds=3600):
+        self.client = client
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.names = {}
+        # 지시문별 tokens (count_tokens 결과, 부르지 않았으면 글자 수 상한)
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def split(template):
+        """template -> (지시문, 전사 뒤에 붙는 부분). template에는 {clean_text}가 한 번 들어 있어야 함."""
+        instruction, suffix = template.split('{clean_text}')
+        return instruction, suffix
+
+    def _cached_name(self, instruction):
+        with self.lock:
+            if instruction not in self.names:
+                self.names[instruction] = self._create(instruction)
+            return self.names[instruction]
+
+    def _create(self, instruction):
+        """지시문이 최소 크기 이상이면 cached content를 만들고 이름을 돌려줌. 아니면 None."""
+        minimum = MIN_CACHE_TOKENS.get(self.model, DEFAULT_MIN_CACHE_TOKENS)
+        self.tokens[instruction] = len(instruction)
+        if len(instruction) < minimum:
+            print(f"지시문이 {len(instruction)}자로 context cache 최소 크기({minimum} tokens)에 못 미쳐서 system_instruction으로 보냄")
+            return None
+        try:
+            tokens = self.client.models.count_tokens(model=self.model, contents=instruction).total_tokens
+            self.tokens[instruction] = tokens
+            if tokens < minimum:
+                print(f"지시문이 {tokens} tokens로 context cache 최소 크기({minimum})보다 작아서 system_instruction으로 보냄")
+                return None
+            cached = self.client.caches.create(
+                model=self.model,
+                config={'system_instruction': instruction, 'ttl': f"{self.ttl_seconds}s"},
+            )
+        except Exception as e:
+            # APIError뿐 아니라 SDK의 ValueError 등도 실행을 멈추지 않고 system_instruction으로 보냄
+            print(f"Context cache를 만들 수 없어 system_instruction으로 보냄: {e}")
+            return None
+        print(f"Created context cache {cached.name} ({tokens} tokens)")
+        return cached.name
+
+    def request(self, template, clean_text, config):
+        """generate_content에 넘길 (contents, config). 지시문은 cached content 또는 system_instruction으로 보냄."""
+        instruction, suffix = self.split(template)
+        name = self._cached_name(instruction)
+        if name is not None:
+            config = dict(config, cached_content=name)
+        else:
+            config = dict(config, system_instruction=instruction)
+        return clean_text + suffix, config
+
+    def instruction_tokens(self, template):
+        """(지시문 tokens, context cache로 보냈는지). request()를 부른 template에만 사용."""
+        instruction, _ = self.split(template)
+        with self.lock:
+            return self.tokens.get(instruction, 0), self.names.get(instruction) is not None
+
+    def close(self):
+        for name in self.names.values():
+            if name is None:
+                continue
+            try:
+                self.client.caches.delete(name=name)
+            except Exception as e:
+                print(f"Context cache {name} 삭제 실패: {e}")
+        self.names = {}
+
+
+class TokenUsage:
+    """응답의 usage_metadata 합계. 여러 스레드에서 공유."""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.local_hits = 0
+        self.instruction_tokens = 0
+        self.context_cached_tokens = 0
+        self.lock = threading.Lock()
+
+    def add(self, response, instruction_tokens=0, context_cached=False):
+        """instruction_tokens: PromptContextCache로 떼어 보낸 지시문 tokens. context_cached면 cached content로 보낸 것."""
+        usage = getattr(response, 'usage_metadata', None)
+        with self.lock:
+            self.requests += 1
+            self.instruction_tokens += instruction_tokens
+            if context_cached:
+                self.context_cached_tokens += instruction_tokens
+            if usage is None:
+                return
+            self.prompt_tokens += usage.prompt_token_count or 0
+            self.cached_tokens += usage.cached_content_token_count or 0
+            self.output_tokens += usage.candidates_token_count or 0
+
+    def add_local_hit(self):
+        """요약 캐시(summary_cache)에서 바로 응답해서 Gemini를 호출하지 않은 요청."""
+        with self.lock:
+            self.local_hits += 1
+
+    def report(self):
+        saved = self.cached_tokens / self.prompt_tokens * 100 if self.prompt_tokens else 0.0
+        text = (f"{self.requests} requests, input {self.prompt_tokens} tokens "
+                f"(cached {self.cached_tokens}, {saved:.1f}% saved), output {self.output_tokens} tokens, "
+                f"{self.local_hits} summary cache hits")
+        if self.instruction_tokens:
+            # 로컬 추정: 지시문 tokens × 요청 수와 그중 context cache로 보내서 다시 올리지 않은 양 (count_tokens를 생략했으면 글자 수 기준 상한)
+            text += (f", instructions ~{self.instruction_tokens} tokens "
+                     f"(context cache {self.context_cached_tokens}, estimated)")
+        return text
+
+    def append_report(self, path, broadcast):
+        """방송별 토큰 사용량을 JSON 한 줄로 추가."""
+        record = {
+            'broadcast': broadcast,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'requests': self.requests,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'output_tokens': self.output_tokens,
+            'instruction_tokens': self.instruction_tokens,
+            'context_cached_tokens': self.context_cached_tokens,
+            'summary_cache_hits': self.local_hits,
+        }
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
@@ -8,6 +8,7 @@ parser.add_argument('--input_mp3_file', required=True, help='Path to the MP3 fil
 parser.add_argument('--output_dir', required=True, help='Base directory where output CSV files will be stored. (should include station-time)')
 parser.add_argument('--date', required=True, help='Date in YYMMDD format, e.g. 240615')
 parser.add_argument('--time', required=True, help='Time string, e.g. 0900')
+parser.add_argument('--pcm_cache', default=None, help='Decoded 16 kHz PCM cache (pcm_cache.py). If given, the segmenter reads it instead of decoding the mp3 again.')
 
 args = parser.parse_args()
 
@@ -33,5 +34,9 @@ def process_mp3_file(input_file, output_dir, csv_file):
 segments_dir = os.path.join(args.output_dir, "segments")
 os.makedirs(segments_dir, exist_ok=True)
 csv_file = os.path.join(segments_dir, f"{args.date}{args.time}.csv")
-print(f"Processing: {args.input_mp3_file} -> {csv_file}")
-process_mp3_file(args.input_mp3_file, segments_dir, csv_file)
+input_file = args.input_mp3_file
+if args.pcm_cache:
+    from pcm_cache import build_pcm_cache
+    input_file = build_pcm_cache(args.input_mp3_file, args.pcm_cache)
+print(f"Processing: {input_file} -> {csv_file}")
+process_mp3_file(input_file, segments_dir, csv_file)
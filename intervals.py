@@ -0,0 +1,180 @@
+import numpy as np
+
+from timeline import Label
+
+# remove-noenergy.py / modify-script.py의 구간 병합 규칙을 timeline.Timeline 배열 연산으로 구현.
+# 예전처럼 df.iloc[i].copy()로 한 행씩 Series를 만들지 않고, 라벨 코드/start/stop 배열에서
+# run-length 연산으로 남길 행 번호와 바뀐 start/stop만 계산함.
+
+NOISY_LABELS = [Label.NO_ENERGY.text, Label.NOISE.text]
+
+
+def run_starts(mask):
+    """mask가 True인 각 위치에 대해, 그 위치가 속한 연속 True 구간의 시작 위치."""
+    idx = np.arange(len(mask))
+    head = mask & ~np.concatenate([[False], mask[:-1]])
+    return np.maximum.accumulate(np.where(head, idx, 0))
+
+
+def merge_no_energy_first(tl):
+    """noEnergy/noise 행은 바로 다음 행에 합침 (다음 행의 start를 noEnergy의 start로).
+
+    앞에서부터 짝을 지으므로 연속된 noisy 행 중 run 안에서 짝수 번째 위치만 다음 행을 흡수하고,
+    흡수된 행은 그 자체가 noisy여도 그대로 남음. 마지막 행이 흡수할 행이 없는 noisy면 그대로 둠.
+    """
+    n = len(tl)
+    if n == 0:
+        return tl
+    noisy = tl.is_label(*NOISY_LABELS)
+    idx = np.arange(n)
+    absorbs = noisy & ((idx - run_starts(noisy)) % 2 == 0)
+    absorbed = np.concatenate([[False], absorbs[:-1]])
+    keep = ~absorbs | (idx == n - 1)
+    start = tl.start.copy()
+    start[absorbed] = start[np.flatnonzero(absorbed) - 1]
+    rows = np.flatnonzero(keep)
+    return tl.take(rows).replace(start=start[rows])
+
+
+def merge_rows(tl):
+    """길이가 0 이하인 행은 같은 라벨의 다음 행까지 이어 붙이고, 그 사이의 다른 라벨 행은 버림.
+
+    길이가 양수인 행들은 그대로 통과시키고(벡터 슬라이스), 0 이하 행에서 시작하는 흡수 구간만
+    배열 위에서 순차적으로 처리함. ina 결과에서는 이런 행이 거의 없어서 사실상 전부 벡터 연산.
+    """
+    n = len(tl)
+    if n == 0:
+        return tl
+    codes = tl.codes
+    # 길이 판정은 예전처럼 초 단위 float로 (1ms보다 짧은 행이 길이 0으로 바뀌지 않게)
+    start = tl.start
+    stop = tl.stop.copy()
+    empty = np.flatnonzero(stop - start <= 0)
+
+    rows = []
+    pos = 0
+    while pos < n:
+        k = np.searchsorted(empty, pos)
+        if k == len(empty):
+            rows.append(np.arange(pos, n))
+            break
+        current = int(empty[k])
+        rows.append(np.arange(pos, current + 1))
+        # current가 양수 길이가 될 때까지 뒤의 같은 라벨 행을 흡수
+        j = current + 1
+        while j < n and stop[current] - start[current] <= 0:
+            if codes[j] == codes[current]:
+                stop[current] = max(stop[current], stop[j])
+            j += 1
+        pos = j
+    rows = np.concatenate(rows)
+    return tl.take(rows).replace(stop=stop[rows])
+
+
+def merge_play_segments(tl, max_gap=240):
+    """연속된 play segment를 하나로 합침 + play끼리 간격 240초 미만이면 병합 (예전과 같은 결과가 나오게 초 단위로 비교)"""
+    if len(tl) == 0:
+        return tl
+    play = tl.codes == Label.PLAY
+    joins = np.concatenate([[False], play[1:] & play[:-1] & (tl.start[1:] - tl.stop[:-1] < max_gap)])
+    return tl.coalesce(joins)
+
+
+def label_blocks(tl, kinds=(Label.SPEECH, Label.MUSIC)):
+    """modify-script.py의 speech/music 블록 병합.
+
+    speech(music) 행에서 블록이 시작되고, 뒤따르는 같은 라벨과 noEnergy/noise 행을 모두 흡수함.
+    블록 밖의 noEnergy/noise와 그 외 라벨 행은 버림. 블록 순서는 원래 행 순서.
+    """
+    n = len(tl)
+    if n == 0:
+        return tl
+    codes = tl.codes
+    kind_codes = [int(k) for k in kinds]
+    noisy = tl.is_label(*NOISY_LABELS)
+    is_kind = np.isin(codes, kind_codes)
+
+    # 각 행 직전의 noisy가 아닌 행의 라벨 = 현재 열려 있는 블록의 종류 (없으면 -1)
+    last_solid = np.maximum.accumulate(np.where(~noisy, np.arange(n), -1))
+    before = np.concatenate([[-1], last_solid[:-1]])
+    state = np.where(before >= 0, codes[np.maximum(before, 0)], -1)
+    state = np.where(np.isin(state, kind_codes), state, -1)
+
+    head = is_kind & (state != codes)
+    breaks = np.flatnonzero(~noisy & ~(is_kind & (state == codes)))
+    heads = np.flatnonzero(head)
+    following = np.searchsorted(breaks, heads, side='right')
+    ends = np.where(following < len(breaks), breaks[np.minimum(following, len(breaks) - 1)], n) - 1
+    return tl.take(heads).replace(stop=tl.stop[ends])
+
+
+def play_segments(tl, identify=None, min_song_seconds=20, min_play_seconds=60, min_gap=100):
+    """modify-script.py의 play 판정. ina 원본 timeline -> speech/music/play 구간 timeline.
+
+    label_blocks로 만든 music 블록 중 min_play_seconds 이상이고 앞뒤 play 후보와의 간격이 min_gap 이상인 블록을 play로 바꿈.
+    identify(block)를 주면 min_song_seconds 이상인 music 블록마다 호출해서 True인 블록은 길이/간격 규칙과 상관없이 play로 확정.
+    길이/간격은 예전처럼 초 단위 float로 비교 (frame*0.02 값에서 59.99999999999999초 같은 경계가 그대로 판정되게).
+    """
+    blocks = label_blocks(tl)
+    is_music = blocks.codes == Label.MUSIC
+    long_music = is_music & (blocks.duration >= min_play_seconds)
+
+    identified = np.zeros(len(blocks), dtype=bool)
+    if identify is not None:
+        for k in np.flatnonzero(is_music & (blocks.duration >= min_song_seconds)):
+            identified[k] = bool(identify(blocks[k]))
+
+    candidates = np.flatnonzero(long_music & ~identified)
+    gap_ok = blocks.start[candidates[1:]] - blocks.stop[candidates[:-1]] >= min_gap
+    valid = np.ones(len(candidates), dtype=bool)
+    valid[1:] &= gap_ok
+    valid[:-1] &= gap_ok
+
+    play = identified.copy()
+    play[candidates[valid]] = True
+    blocks = blocks.relabel(play, Label.PLAY.text)
+
+    # 예전 결과와 같은 순서 (speech/짧은 music -> play가 안 된 후보 -> play) 로 모은 뒤 start로 정렬.
+    # 길이 0인 블록끼리 start가 같을 때도 예전 pandas sort_values(quicksort)와 같은 순서가 나오게 함
+    order = np.concatenate([np.flatnonzero(~long_music & ~identified), candidates[~valid], candidates[valid], np.flatnonzero(identified)])
+    blocks = blocks.take(order)
+    return merge_play_segments(blocks.take(np.argsort(blocks.start, kind='quicksort')))
+
+
+def assign_first_overlap(tl, ids, starts, stops):
+    """각 행에 겹치는 첫 구간(목록 순서)의 id를 할당. 겹치는 구간이 없으면 0. starts/stops는 초 단위.
+
+    요약 구간처럼 start/stop이 모두 정렬된 목록이면 searchsorted 한 번으로 끝남.
+    정렬되지 않은 목록은 구간마다 한 번씩 행 전체 mask로 처리 (뒤 구간부터 덮어써서 앞 구간이 우선).
+    경계가 같은지는 예전처럼 float로 비교함 (summary.txt의 소수 둘째 자리 값과 행의 frame*0.02 값).
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.float64)
+    stops = np.asarray(stops, dtype=np.float64)
+    assigned = np.zeros(len(tl), dtype=np.int64)
+    if len(tl) == 0 or len(ids) == 0:
+        return assigned
+    if np.all(np.diff(starts) >= 0) and np.all(np.diff(stops) >= 0):
+        # stop > 행 start인 첫 구간이 겹치지 않으면 그 뒤 구간(start가 더 늦음)도 겹치지 않음
+        first = np.searchsorted(stops, tl.start, side='right')
+        k = np.minimum(first, len(ids) - 1)
+        hit = (first < len(ids)) & (starts[k] < tl.stop)
+        assigned[hit] = ids[k[hit]]
+        return assigned
+    for s_id, s_start, s_stop in reversed(list(zip(ids, starts, stops))):
+        assigned[(tl.stop > s_start) & (tl.start < s_stop)] = s_id
+    return assigned
+
+
+def fill_unassigned(assigned):
+    """0(미할당)인 값을 뒤쪽의 첫 양수 값으로, 뒤에 양수가 없으면 앞쪽의 마지막 양수 값으로 채움."""
+    assigned = np.asarray(assigned).copy()
+    known = np.flatnonzero(assigned > 0)
+    missing = np.flatnonzero(assigned == 0)
+    if len(known) == 0 or len(missing) == 0:
+        return assigned
+    following = np.searchsorted(known, missing)
+    has_next = following < len(known)
+    assigned[missing[has_next]] = assigned[known[following[has_next]]]
+    assigned[missing[~has_next]] = assigned[known[-1]]
+    return assigned
@@ -1,10 +1,18 @@
-import pandas as pd
 import subprocess
 import os
+import sys
 import argparse
 import re
 from dotenv import load_dotenv
 import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from playlist_index import PlaylistIndex
+from timeline import SEGMENTER, SEGMENTS_INFO, Label, Timeline, clock_to_ms
 
 load_dotenv()
 
@@ -14,9 +22,26 @@ parser.add_argument('--output_base_dir', required=True, help='Base directory whe
 parser.add_argument('--date', required=True, help='Date in YYMMDD format, e.g. 240615.')
 parser.add_argument('--time', required=True, help='Time string, e.g. 0900.')
 parser.add_argument('--station', required=True, help='Station name.')
+parser.add_argument('--asr_mode', choices=['engine', 'pool', 'subprocess'], default='engine', help='engine: load the ASR model once and reuse it, pool: transcribe in parallel in a pool of CPU worker processes, subprocess: run the whisper CLI per segment (old behaviour).')
+parser.add_argument('--asr_backend', choices=['auto', 'whisper', 'faster-whisper'], default='auto', help='auto: whisper large on CUDA if a GPU is available, otherwise int8 faster-whisper (pool mode always uses the CPU choice).')
+parser.add_argument('--asr_model', default=None, help='ASR model size, e.g. large, medium, small. Chosen from the backend and hardware by default.')
+parser.add_argument('--asr_device', default=None, help='ASR device (cuda, cpu). Chosen automatically by default.')
+parser.add_argument('--asr_threads', type=int, default=None, help='Number of CPU threads for ASR.')
+parser.add_argument('--beam_size', type=int, default=None, help='ASR beam size (default 5, same as the whisper CLI).')
+parser.add_argument('--asr_workers', type=int, default=max((os.cpu_count() or 1) // 4, 1), help='Number of worker processes in pool mode.')
+parser.add_argument('--max_piece_seconds', type=float, default=60.0, help='In pool mode, rows longer than this are split at pauses and transcribed in parallel.')
+parser.add_argument('--pcm_cache', default=None, help='Decoded 16 kHz PCM cache (pcm_cache.py). In engine mode whisper reads sample ranges from it instead of decoding each piece.')
+parser.add_argument('--cut_mode', choices=['frame_index', 'single_pass', 'per_row'], default='frame_index', help='frame_index: copy byte ranges using the mp3 frame index (no decoding), single_pass: write every piece in one pass over the source, per_row: run ffmpeg per row (old behaviour).')
+parser.add_argument('--transcript_cache', default=None, help='SQLite transcript cache (requires --pcm_cache). Segments with the same audio and ASR settings are not transcribed again.')
+parser.add_argument('--transcript_cache_mb', type=int, default=2048, help='Maximum transcript cache size in MB. Least recently used entries are evicted first.')
+parser.add_argument('--fingerprint_db', default=None, help='Jingle/ad fingerprint DB (fingerprint.py, requires --pcm_cache). Matching rows skip ASR and use the stored transcript and tag (ad, jingle, ...).')
+parser.add_argument('--fingerprint_max_seconds', type=float, default=90.0, help='Rows longer than this are not looked up in the fingerprint DB.')
+parser.add_argument('--song_index', default=None, help='Song chroma index (song_index.py, requires --pcm_cache). Identifies play rows by the song itself and fills in [Artist - Title].')
+parser.add_argument('--resume', action='store_true', help='Skip rows already recorded in segments_info.csv.journal and continue from there.')
+parser.add_argument('--prefetch_workers', type=int, default=4, help='Number of threads that cut pieces and load audio ahead of ASR.')
 args = parser.parse_args()
 
-def extract_segment(input_file, start, duration, output_file, label, transcript_dir):
+def cut_segment(input_file, start, duration, output_file):
     command = [
         'ffmpeg',
         '-i', input_file,
@@ -26,9 +51,17 @@ def extract_segment(input_file, start, duration, output_file, label, transcript_
         output_file,
         '-y'
     ]
-    transcribed_text = ""
     subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     print("done: ", command)
+
+def transcribe_segment(start, output_file, label, transcript_dir, engine=None, audio=None):
+    if engine is not None:
+        transcribed_text = engine.transcribe_to_dir(output_file if audio is None else audio, os.path.basename(output_file), transcript_dir)
+    else:
+        transcribed_text = transcribe_subprocess(output_file, transcript_dir)
+    return write_transcript(start, output_file, label, transcript_dir, transcribed_text), transcribed_text
+
+def write_transcript(start, output_file, label, transcript_dir, transcribed_text):
     file_names = {'MP3': '', 'Transcript': ''}
     if label == 'speech' or label == 'music':
         if label == 'speech':
@@ -36,72 +69,129 @@ def extract_segment(input_file, start, duration, output_file, label, transcript_
         elif label == 'music':
             transcript_filename = f"music_{int(start)}.txt"
         full_transcript_path = os.path.join(transcript_dir, transcript_filename)
-        whisper_command = [
-            'whisper',
-            output_file,
-            '--model', 'large',
-            '--language', 'ko',
-            '--output_format', 'txt',
-            '--device', 'cuda',
-            '--condition_on_previous_text', 'False',
-            '--output_dir', transcript_dir,
-        ]
-        transcription = subprocess.run(whisper_command, stdout=subprocess.PIPE, text=True)
-        transcribed_text = transcription.stdout.strip()
         with open(full_transcript_path, 'w') as f:
             f.write(transcribed_text)
         file_names['Transcript'] = transcript_filename
     file_names['MP3'] = os.path.basename(output_file)
-    return file_names, transcribed_text
-
-def time_to_seconds(time_str):
-    h, m = map(int, time_str.split(":"))
-    return h * 3600 + m * 60
-
-def apply_playlist_labels(df, playlist, broadcast_start_time):
-    # 1. playlist 곡 구간(초 단위) 리스트 생성
-    start_sec = time_to_seconds(broadcast_start_time)
-    song_segments = []
-    for song in playlist:
-        song_time = song.get("Time")
-        duration = song.get("Duration") or song.get("DurationSec")
-        if not song_time or not duration:
-            continue
-        song_start_sec = time_to_seconds(song_time) - start_sec
-        if song_start_sec < 0:
-            continue
-        # duration이 "mm:ss" 형식이면 초로 변환
-        if isinstance(duration, str) and ":" in duration:
-            mm, ss = map(int, duration.split(":"))
-            duration_sec = mm * 60 + ss
-        else:
-            duration_sec = float(duration)
-        song_end_sec = song_start_sec + duration_sec
-        song_segments.append((song_start_sec, song_end_sec))
-
-    # 2. 각 row를 곡 구간 기준으로 쪼개기
-    new_rows = []
-    for idx, row in df.iterrows():
-        seg_start, seg_stop, label = float(row['start']), float(row['stop']), row['labels']
-        cur = seg_start
-        splits = []
-        for song_start, song_end in song_segments:
+    return file_names
+
+def transcribe_subprocess(output_file, transcript_dir):
+    whisper_command = [
+        'whisper',
+        output_file,
+        '--model', 'large',
+        '--language', 'ko',
+        '--output_format', 'txt',
+        '--device', 'cuda',
+        '--condition_on_previous_text', 'False',
+        '--output_dir', transcript_dir,
+    ]
+    transcription = subprocess.run(whisper_command, stdout=subprocess.PIPE, text=True)
+    return transcription.stdout.strip()
+
+def prefetch_jobs(jobs, prepare, workers):
+    """prepare(job)을 스레드 풀에서 미리 실행하고 끝난 job부터 내보냄.
+
+    큐에 쌓이는 job은 최대 workers * 2개로 제한해서 메모리가 방송 길이에 비례해 늘지 않게 함.
+    결과는 job['seg']에 직접 채우므로 segment_data는 group_id 순서를 그대로 유지함.
+    """
+    done = queue.Queue()
+    slots = threading.Semaphore(workers * 2)
+
+    def run(job):
+        try:
+            prepare(job)
+        except Exception as e:
+            job['error'] = e
+        done.put(job)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def feed():
+            for job in jobs:
+                slots.acquire()
+                pool.submit(run, job)
+        threading.Thread(target=feed, daemon=True).start()
+        for _ in range(len(jobs)):
+            job = done.get()
+            slots.release()
+            if 'error' in job:
+                raise job['error']
+            yield job
+
+JOURNAL_FIELDS = ['MP3 File', 'Transcript File', 'Transcript']
+
+def load_journal(journal_path):
+    """체크포인트 journal(JSONL)을 읽어서 {Id: row} 반환. 중간에 끊긴 마지막 줄은 무시."""
+    done_rows = {}
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if 'Id' in row:
+                done_rows[row['Id']] = row
+    return done_rows
+
+def open_journal(journal_path, resume):
+    if resume and os.path.exists(journal_path):
+        # 이전 실행이 남긴 완료 표시({"done": true, ...})와 중간에 끊긴 마지막 줄은 지우고 행만 남김.
+        # 그대로 두면 summarize.py --follow가 이전 완료 표시를 보고 바로 끝남. 제자리에서 줄이므로 follow 쪽은 처음부터 다시 읽음
+        with open(journal_path, 'r+', encoding='utf-8') as f:
+            rows = []
+            for line in f:
+                try:
+                    if 'Id' in json.loads(line):
+                        rows.append(line.rstrip("\n") + "\n")
+                except json.JSONDecodeError:
+                    continue
+            f.seek(0)
+            f.writelines(rows)
+            f.truncate()
+    return open(journal_path, 'a' if resume else 'w', encoding='utf-8')
+
+def append_journal(journal, seg, label):
+    # Type은 지문 매칭으로 ad/jingle 등으로 바뀔 수 있어서, 계획 단계의 라벨을 Label로 따로 기록
+    row = {key: seg[key] for key in ['Id', 'Start Time', 'Stop Time', 'Type'] + JOURNAL_FIELDS}
+    row['Label'] = label
+    journal.write(json.dumps(row, ensure_ascii=False) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+def apply_playlist_labels(timeline, playlist_index):
+    # 각 row를 곡 구간 기준으로 쪼개기 (겹칠 수 있는 곡만 bisect로 찾아서 확인)
+    # 비교는 밀리초로 하고, 쪼개지지 않은 경계는 원래 초 값을 그대로 씀
+    labels, starts, stops = [], [], []
+    for row in timeline.records():
+        seg_start, seg_stop, label = row.start_ms, row.stop_ms, row.label
+        cur, cur_sec = seg_start, row.start
+        for song_start, song_end in playlist_index.overlapping(seg_start, seg_stop):
             # 겹치는 구간 계산
             overlap_start = max(cur, song_start)
             overlap_end = min(seg_stop, song_end)
             if overlap_start < overlap_end:
+                start_sec = cur_sec if overlap_start == cur else overlap_start / 1000.0
+                end_sec = row.stop if overlap_end == seg_stop else overlap_end / 1000.0
                 # 앞부분(겹치기 전)
                 if cur < overlap_start:
-                    splits.append({'labels': label, 'start': cur, 'stop': overlap_start})
+                    labels.append(label); starts.append(cur_sec); stops.append(start_sec)
                 # play 구간
-                splits.append({'labels': 'play', 'start': overlap_start, 'stop': overlap_end})
-                cur = overlap_end
+                labels.append(Label.PLAY.text); starts.append(start_sec); stops.append(end_sec)
+                cur, cur_sec = overlap_end, end_sec
         # 남은 뒷부분
         if cur < seg_stop:
-            splits.append({'labels': label, 'start': cur, 'stop': seg_stop})
-        new_rows.extend(splits)
-    new_df = pd.DataFrame(new_rows)
-    return new_df
+            labels.append(label); starts.append(cur_sec); stops.append(row.stop)
+    return Timeline.from_labels(labels, starts, stops)
+
+def skip_run(message):
+    """처리할 입력이 없을 때. summarize.py --follow가 계속 기다리지 않도록 행 0개짜리 완료 표시를 journal에 남기고 실패로 종료."""
+    print(message)
+    transcript_dir = os.path.join(args.output_base_dir, "transcripts")
+    os.makedirs(transcript_dir, exist_ok=True)
+    # --resume용 기존 기록은 그대로 두고 뒤에 추가 (load_journal은 Id 없는 줄을 무시하고, --resume으로 다시 열 때 지움)
+    with open(os.path.join(transcript_dir, "segments_info.csv.journal"), 'a', encoding='utf-8') as journal:
+        journal.write("\n" + json.dumps({'done': True, 'rows': 0}) + "\n")
+    sys.exit(1)
 
 station = args.station
 mp3_file = args.mp3_file
@@ -119,7 +209,7 @@ if date_match:
     
     if os.path.exists(read_csv):
         print(f"Processing {mp3_file} with associated CSV {read_csv}")
-        df = pd.read_csv(read_csv, sep=',')
+        timeline = Timeline.read_csv(read_csv, schema=SEGMENTER)
 
         playlist_json_path = os.path.join(os.getcwd(), "input", args.date, f"{station}-{args.time}-playlist.json")
         try:
@@ -130,47 +220,44 @@ if date_match:
             playlist = []
 
         # 🌟 방송국별 playlist 기반 play label 덮어쓰기 및 초기화 로직
-        mbc_playlist_index = 0 # MBC playlist 순차 처리를 위한 인덱스
+        # playlist는 한 번만 정렬된 인덱스로 만들어서 시간 기반(kbs2fm, sbs)/순차(MBC) 조회에 같이 사용
+        playlist_index = PlaylistIndex(playlist, clock_to_ms(f"{args.time[:2]}:{args.time[2:]}"))
 
         if station in ['kbs2fm', 'sbs'] and playlist:
             # 기존 로직: kbs2fm, sbs는 Time 정보 기반으로 play 라벨 덮어쓰기
-            broadcast_start_time = f"{args.time[:2]}:{args.time[2:]}"
-            # apply_playlist_labels 함수는 외부 정의 필요
-            df = apply_playlist_labels(df, playlist, broadcast_start_time)
+            timeline = apply_playlist_labels(timeline, playlist_index)
         elif station == 'mbc' and playlist:
             # MBC는 Time 정보가 없으므로, playlist의 곡을 순차적으로 사용하기 위해
             # apply_playlist_labels는 사용하지 않음.
             pass
 
-        # 병합 로직 추가: (이전과 동일)
-        merged_segments = []
-        prev_row = None
-        for idx, row in df.iterrows():
-            row_start = float(row['start'])
-            row_stop = float(row['stop'])
-            # 1초 미만 간격이면 병합
-            if prev_row is not None and row['labels'] == prev_row['labels'] and abs(row_start - float(prev_row['stop'])) < 1:
-                prev_row['stop'] = row_stop
-            else:
-                if prev_row is not None:
-                    merged_segments.append(prev_row)
-                prev_row = row.copy()
-                prev_row['start'] = row_start
-                prev_row['stop'] = row_stop
-        if prev_row is not None:
-            merged_segments.append(prev_row)
-        df = pd.DataFrame(merged_segments)
+        # 병합 로직: 같은 라벨이 1초 미만 간격으로 이어지면 앞 행에 병합
+        same_label = timeline.codes[1:] == timeline.codes[:-1]
+        close = np.abs(timeline.start[1:] - timeline.stop[:-1]) < 1
+        timeline = timeline.coalesce(np.concatenate([[False], same_label & close]))
 
         song_index = 0
         group_id = 1
         segment_data = []
+        jobs = []
 
-        for i in range(len(df)):
-            row = df.iloc[i]
-            label = row['labels']
-            start_time = row['start']
-            stop_time = row['stop']
-            duration = stop_time - start_time
+        pcm = None
+        if args.pcm_cache:
+            from pcm_cache import PcmCache, build_pcm_cache
+            pcm = PcmCache(build_pcm_cache(mp3_file, args.pcm_cache))
+
+        songs = None
+        if args.song_index and pcm is None:
+            print("--song_index requires --pcm_cache; song identification disabled.")
+        elif args.song_index:
+            from song_index import SongIndex
+            songs = SongIndex.load(args.song_index)
+
+        for row in timeline.records():
+            label = row.label
+            start_time = row.start
+            stop_time = row.stop
+            duration = row.duration
 
             seg = {
                 'Id': group_id,
@@ -188,29 +275,22 @@ if date_match:
                 seg['Transcript File'] = "N/A"
                 
                 matched_song_info = None
+                identified = songs.identify(pcm.read_float(start_time, stop_time)) if songs is not None else None
 
-                if station in ['kbs2fm', 'sbs']:
+                if identified is not None:
+                    # 곡 지문으로 식별되면 playlist 시간/순서와 상관없이 바로 사용
+                    matched_song_info = identified
+                    if station == 'mbc':
+                        # MBC 순차 인덱스를 식별된 곡 다음으로 맞춰서 한 곡을 놓쳐도 이후 곡들이 밀리지 않게 함
+                        playlist_index.seek_after(identified['Artist'], identified['Title'])
+                elif station in ['kbs2fm', 'sbs']:
                     # 기존 로직: Time 정보가 있는 방송국 (kbs2fm, sbs)
                     # playlist에서 해당 구간의 곡 정보 찾기 (start_time이 곡 시작 시간과 가장 가까운 곡을 찾음)
-                    min_diff = float('inf')
-                    for song in playlist:
-                        song_time = song.get("Time")
-                        if not song_time: continue
-                        # 방송 시작 시간 기준 상대 초
-                        # time_to_seconds 함수는 외부 정의 필요
-                        song_start_sec = time_to_seconds(song_time) - time_to_seconds(f"{args.time[:2]}:{args.time[2:]}")
-                        diff = abs(start_time - song_start_sec)
-                        if diff < min_diff:
-                            min_diff = diff
-                            matched_song_info = song
-                            
+                    matched_song_info = playlist_index.nearest(row.start_ms)
                 elif station == 'mbc':
                     # 🌟 MBC 로직: Time 정보가 없으므로, play 세그먼트가 나타날 때마다 playlist를 순차적으로 사용
-                    if mbc_playlist_index < len(playlist):
-                        matched_song_info = playlist[mbc_playlist_index]
-                        mbc_playlist_index += 1 # 인덱스 증가
-                    
-                
+                    matched_song_info = playlist_index.next_song()
+
                 if matched_song_info and matched_song_info.get('Artist') and matched_song_info.get('Title'):
                     seg['Transcript'] = f"[{matched_song_info['Artist']} - {matched_song_info['Title']}]"
                 else:
@@ -220,40 +300,182 @@ if date_match:
                 group_id += 1
                 continue
                 
-            elif label in ['speech', 'music']:
+            else: # speech, music, noise, noEnergy etc.
                 label_prefix = f"{label}_"
                 output_filename = os.path.join(segment_dir, f"{label_prefix}output_segment_{group_id}.mp3")
-                # extract_segment 함수는 외부 정의 필요
-                file_names, transcribed_text = extract_segment(
-                    mp3_file,
-                    start_time, duration, output_filename, label, transcript_dir
-                )
-                seg['MP3 File'] = file_names['MP3']
-                seg['Transcript File'] = file_names['Transcript']
-                seg['Transcript'] = transcribed_text
+                jobs.append({'seg': seg, 'label': label, 'start': start_time, 'stop': stop_time, 'duration': duration, 'output': output_filename})
                 segment_data.append(seg)
                 group_id += 1
-                
-            else: # noise, noEnergy etc.
-                label_prefix = f"{label}_"
-                output_filename = os.path.join(segment_dir, f"{label_prefix}output_segment_{group_id}.mp3")
-                # extract_segment 함수는 외부 정의 필요
-                file_names, transcribed_text = extract_segment(
-                    mp3_file,
-                    start_time, duration, output_filename, label, transcript_dir
+
+        # 체크포인트: 끝난 행은 바로 journal에 추가하고, --resume이면 journal에 있는 행은 다시 처리하지 않음
+        journal_path = to_csv + '.journal'
+        done_rows = load_journal(journal_path) if args.resume and os.path.exists(journal_path) else {}
+        remaining = []
+        for job in jobs:
+            seg = job['seg']
+            done = done_rows.get(int(seg['Id']))
+            if done and done.get('Label', done['Type']) == seg['Type'] and done['Start Time'] == seg['Start Time'] and done['Stop Time'] == seg['Stop Time']:
+                for key in ['Type'] + JOURNAL_FIELDS:
+                    seg[key] = done[key]
+                continue
+            remaining.append(job)
+        if args.resume:
+            print(f"Resuming from {journal_path}: {len(jobs) - len(remaining)} of {len(jobs)} rows already done")
+        jobs = remaining
+        journal = open_journal(journal_path, args.resume)
+        # play 행은 전사가 없으므로 바로 기록 (summarize.py --follow가 구간 경계를 바로 알 수 있게)
+        for seg in segment_data:
+            if seg['Type'] == 'play':
+                append_journal(journal, seg, 'play')
+
+        engine_options = {
+            'backend': args.asr_backend, 'model': args.asr_model, 'device': args.asr_device,
+            'threads': args.asr_threads, 'beam_size': args.beam_size,
+            'language': 'ko', 'condition_on_previous_text': False,
+        }
+        if args.asr_mode == 'pool':
+            # 워커는 CPU에서 돌므로 부모에서 CPU용 backend/모델(auto면 int8 faster-whisper)로 미리 정해둠.
+            # 부모에서 CUDA 확인으로 torch를 import한 뒤 fork하지 않도록 cpu_only로 확인을 건너뜀
+            from asr_engine import resolve_options
+            engine_options = resolve_options(**dict(engine_options, device=args.asr_device or 'cpu'), cpu_only=True)
+            print(f"ASR pool: {args.asr_workers} workers x {engine_options['backend']} '{engine_options['model']}' on {engine_options['device']}")
+
+        def finish_job(job, file_names, transcribed_text):
+            seg = job['seg']
+            seg['MP3 File'] = file_names['MP3']
+            seg['Transcript File'] = file_names['Transcript']
+            seg['Transcript'] = transcribed_text
+            # ASR가 실패하면 빈 문자열이 돌아오므로 저장하지 않음 (다음 실행에서 다시 전사)
+            if cache is not None and 'cache_key' in job and transcribed_text.strip():
+                cache.put(job['cache_key'], transcribed_text)
+            append_journal(journal, seg, job.get('plan_label', job['label']))
+
+        # 지문 DB: 반복되는 징글/스테이션 ID/광고는 전사 없이 저장된 전사를 쓰고 Type을 태그로 바꿈
+        # (summarize.py는 speech/music 행만 요약에 넣으므로 태그된 행은 프롬프트에서 빠짐)
+        if args.fingerprint_db and pcm is None:
+            print("--fingerprint_db requires --pcm_cache; fingerprint lookup disabled.")
+        elif args.fingerprint_db:
+            from fingerprint import FingerprintDB
+            fingerprint_db = FingerprintDB(args.fingerprint_db)
+            matched = 0
+            for job in jobs:
+                if job['label'] not in ['speech', 'music'] or job['duration'] > args.fingerprint_max_seconds:
+                    continue
+                found = fingerprint_db.match(pcm.read_float(job['start'], job['stop']))
+                if found is not None:
+                    job['plan_label'] = job['label']
+                    job['label'] = found['label']
+                    job['transcript'] = found['transcript']
+                    job['seg']['Type'] = found['label']
+                    matched += 1
+            fingerprint_db.close()
+            print(f"Fingerprint DB: {matched} segments matched known jingles/ads")
+
+        # 전사 캐시: 오디오 샘플 + ASR 설정이 같으면 이전 결과를 재사용하고 전사를 건너뜀 (key 계산에 PCM 캐시가 필요함).
+        # 조각 mp3는 MP3 File 컬럼이 가리키는 파일이 있도록 그대로 자름
+        cache = None
+        if args.transcript_cache and pcm is None:
+            print("--transcript_cache requires --pcm_cache; transcript cache disabled.")
+        elif args.transcript_cache:
+            from asr_engine import parse_transcript, resolve_options, write_txt
+            from transcript_cache import TranscriptCache
+            if args.asr_mode == 'subprocess':
+                asr_settings = {'backend': 'whisper-cli', 'model': 'large', 'device': 'cuda', 'language': 'ko', 'condition_on_previous_text': False}
+            else:
+                asr_settings = resolve_options(**engine_options)
+                asr_settings.pop('threads', None)
+                if args.asr_mode == 'pool':
+                    asr_settings['max_piece_seconds'] = args.max_piece_seconds
+            cache = TranscriptCache(args.transcript_cache, asr_settings, max_bytes=args.transcript_cache_mb * 1024 * 1024)
+            for job in jobs:
+                if job['label'] in ['speech', 'music']:
+                    job['cache_key'] = cache.key(pcm.read(job['start'], job['stop']))
+                    transcribed_text = cache.get(job['cache_key'])
+                    if transcribed_text is not None:
+                        del job['cache_key']
+                        job['cached'] = transcribed_text
+
+        # 모델 로딩은 실행당 한 번만 (subprocess 모드는 세그먼트마다 whisper CLI 실행)
+        engine = None
+        needs_asr = any(job['label'] in ['speech', 'music'] and 'cached' not in job for job in jobs)
+        if args.asr_mode == 'engine' and needs_asr:
+            from asr_engine import create_engine
+            engine = create_engine(**engine_options)
+
+        # pool 모드: GPU 없이 CPU 코어 수만큼 워커를 띄우고 긴 speech 구간은 나눠서 병렬 전사
+        pool = None
+        if args.asr_mode == 'pool' and needs_asr:
+            from asr_pool import EnginePool
+            pool = EnginePool(args.asr_workers, engine_options, max_piece_seconds=args.max_piece_seconds)
+
+        # 조각 mp3 자르기: single_pass는 원본을 한 번만 읽어서 모든 조각을 미리 만들고,
+        # frame_index/per_row는 job마다 잘라서 ASR과 겹쳐서 실행
+        slicer = None
+        if args.cut_mode == 'single_pass' and jobs:
+            from segment_splitter import split_segments
+            split_segments(mp3_file, [(job['start'], job['stop'], job['output']) for job in jobs])
+        elif args.cut_mode == 'frame_index' and jobs:
+            from mp3_index import Mp3Slicer
+            slicer = Mp3Slicer(mp3_file)
+
+        def prepare_job(job):
+            if args.cut_mode == 'per_row':
+                cut_segment(mp3_file, job['start'], job['duration'], job['output'])
+            elif slicer is not None:
+                slicer.cut(job['start'], job['stop'], job['output'])
+            if (engine is not None or pool is not None) and job['label'] in ['speech', 'music'] and 'cached' not in job:
+                if pcm is not None:
+                    job['audio'] = pcm.read_float(job['start'], job['stop'])
+                else:
+                    from asr_engine import load_audio
+                    job['audio'] = load_audio(job['output'])
+
+        def drain(pending, limit):
+            # pool 모드: 제출 순서대로 결과를 받아서 행에 채움. limit개 이하만 남겨서 큐에 쌓이는 오디오를 제한
+            while len(pending) > limit:
+                job = pending.pop(0)
+                transcribed_text = job.pop('future').result()
+                finish_job(job, write_transcript(job['start'], job['output'], job['label'], transcript_dir, transcribed_text), transcribed_text)
+
+        pending = []
+        for job in prefetch_jobs(jobs, prepare_job, args.prefetch_workers):
+            if 'cached' in job:
+                transcribed_text = job.pop('cached')
+                write_txt(parse_transcript(transcribed_text), job['output'], transcript_dir)
+                finish_job(job, write_transcript(job['start'], job['output'], job['label'], transcript_dir, transcribed_text), transcribed_text)
+            elif job['label'] in ['speech', 'music']:
+                if pool is not None:
+                    job['future'] = pool.submit(job.pop('audio'), os.path.basename(job['output']), transcript_dir)
+                    pending.append(job)
+                    drain(pending, args.asr_workers * 2)
+                    continue
+                file_names, transcribed_text = transcribe_segment(
+                    job['start'], job['output'], job['label'], transcript_dir, engine, job.pop('audio', None)
                 )
-                seg['MP3 File'] = file_names['MP3']
-                seg['Transcript File'] = "N/A"
-                seg['Transcript'] = ""
-                segment_data.append(seg)
-                group_id += 1
+                finish_job(job, file_names, transcribed_text)
+            else:
+                finish_job(job, {'MP3': os.path.basename(job['output']), 'Transcript': "N/A"}, job.get('transcript', ""))
+        drain(pending, 0)
+        # 모든 행이 끝났다는 표시 (summarize.py --follow 종료 조건). Id가 없어서 load_journal은 무시함
+        journal.write(json.dumps({'done': True, 'rows': len(segment_data)}) + "\n")
+        journal.close()
+        if pool is not None:
+            pool.shutdown()
+        if cache is not None:
+            print(f"Transcript cache: {cache.stats()}")
+            cache.close()
 
-        # Now process extraction and transcription (이후 로직은 동일)
-        segments_df = pd.DataFrame(segment_data)
+        segments = Timeline.from_labels(
+            [seg['Type'] for seg in segment_data],
+            [seg['Start Time'] for seg in segment_data],
+            [seg['Stop Time'] for seg in segment_data],
+            columns={key: np.array([seg[key] for seg in segment_data], dtype=object) for key in ['Id'] + JOURNAL_FIELDS},
+        )
         # Reorder columns to have ID first
         cols = ['Id', 'Start Time', 'Stop Time', 'Duration', 'Type', 'MP3 File', 'Transcript File', 'Transcript']
-        segments_df = segments_df[cols]
-        segments_df.to_csv(to_csv, index=False)
+        segments.write_csv(to_csv, schema=SEGMENTS_INFO, fieldnames=cols)
         print(f"Saved segment information to {to_csv}")
     else:
-        print(f"CSV file {read_csv} not found. Skipping {mp3_file}.")
\ No newline at end of file
+        skip_run(f"CSV file {read_csv} not found. Skipping {mp3_file}.")
+else:
+    skip_run(f"{mp3_file} does not match <station>-<HHMM>.mp3. Skipping.")
\ No newline at end of file
@@ -1,12 +1,14 @@
 import os
 import re
-import pandas as pd
 import argparse
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from pydub import AudioSegment
 
-# 이전에 발생했던 KeyError를 해결하기 위해 'labels' 컬럼을 사용합니다. 
-# 현재 코드에는 'labels'가 사용되고 있으므로 그대로 유지합니다.
-LABEL_COLUMN = 'labels' 
+from intervals import assign_first_overlap, fill_unassigned
+from timeline import Label, Timeline
 
 def parse_summary_intervals(summary_path):
     segments = []
@@ -27,116 +29,367 @@ def parse_summary_intervals(summary_path):
     return segments
 
 def create_label_csv(noenergy_csv_path, summary_path, label_csv_path):
-    df = pd.read_csv(noenergy_csv_path)
+    # 🌟 오류 방지: 'labels' 컬럼이 없으면 Timeline.read_csv에서 KeyError
+    try:
+        timeline = Timeline.read_csv(noenergy_csv_path)
+    except KeyError as e:
+        print(f"🚨 Error: {e}. Please check the column name.")
+        return None
     segments = parse_summary_intervals(summary_path)
+    s_ids = [s_id for s_id, _, _ in segments]
+    s_starts = [s_start for _, s_start, _ in segments]
+    s_stops = [s_stop for _, _, s_stop in segments]
 
-    # 🌟 DEBUG: 입력 CSV의 컬럼 확인
-    print(f"DEBUG: Input CSV Columns: {df.columns.tolist()}")
+    # 🌟 모든 세그먼트(music, noise, noEnergy 등)를 겹치는 첫 Summary ID 구간에 할당 (searchsorted)
+    assigned_segments = assign_first_overlap(timeline, s_ids, s_starts, s_stops)
 
-    # 🌟 오류 방지: 'labels' 컬럼이 있는지 다시 한번 확인
-    if LABEL_COLUMN not in df.columns:
-        print(f"🚨 Error: Column '{LABEL_COLUMN}' not found in the input CSV. Please check the column name.")
-        return None
-
-    assigned_segments = []
-    for idx, row in df.iterrows():
-        # label = row[LABEL_COLUMN] # 현재 코드에서는 사용되지만, 매칭 로직은 모든 세그먼트에 적용
-        start = row['start']
-        stop = row['stop']
-        seg_num = 0
-        
-        # 🌟 수정된 매칭 로직: 모든 세그먼트가 겹치는 Summary ID 구간을 찾습니다.
-        # speech뿐 아니라 모든 세그먼트(music, noise, noEnergy 등)를 긴 요약 구간에 할당합니다.
-        for s_id, s_start, s_stop in segments:
-            # CSV 세그먼트 [start, stop]이 Summary 구간 [s_start, s_stop]과 겹치는지 확인
-            if not (stop <= s_start or start >= s_stop):
-                seg_num = s_id # 요약본 ID를 Segment 번호로 할당
-                break
-        
-        assigned_segments.append(seg_num)
-
-    df['Segment'] = assigned_segments
-
-    # --- 0번 Segment 채우기 로직 유지 (매칭되지 않은 구간을 앞뒤 ID로 채움) ---
-    
-    # 앞쪽 0번 segment -> 다음 segment로
-    for i in range(len(df)):
-        if df.loc[i, 'Segment'] == 0:
-            for j in range(i + 1, len(df)):
-                if df.loc[j, 'Segment'] > 0:
-                    df.at[i, 'Segment'] = df.loc[j, 'Segment']
-                    break
-
-    # 뒤쪽 0번 segment -> 이전 segment로
-    for i in reversed(range(len(df))):
-        if df.loc[i, 'Segment'] == 0:
-            for j in reversed(range(i)):
-                if df.loc[j, 'Segment'] > 0:
-                    df.at[i, 'Segment'] = df.loc[j, 'Segment']
-                    break
-    
-    # ----------------------------------------------------------------------
+    # --- 0번 Segment 채우기: 매칭되지 않은 구간은 다음 ID로, 맨 뒤쪽은 이전 ID로 ---
+    assigned_segments = fill_unassigned(assigned_segments)
 
     # 60초 이상 music → silence로 변경 로직 유지
-    new_labels = []
-    for idx, row in df.iterrows():
-        duration = row['stop'] - row['start']
-        if row[LABEL_COLUMN] == 'music' and duration >= 60:
-            new_labels.append('silence')
-        else:
-            new_labels.append(row[LABEL_COLUMN])
-    df['labels'] = new_labels
+    long_music = (timeline.codes == Label.MUSIC) & (timeline.duration >= 60)
+    timeline = timeline.relabel(long_music, Label.SILENCE.text).with_column('Segment', assigned_segments)
 
-    df.to_csv(label_csv_path, index=False)
+    timeline.write_csv(label_csv_path)
     print(f"Saved label CSV to {label_csv_path}")
-    return df
+    return timeline
 
 # 나머지 merge_segments 함수 및 __main__ 부분은 유지 (컬럼 이름 'labels' 사용 확인)
 # ----------------------------------------------------------------------
 
-def merge_segments(label_csv_path, segment_dir, output_dir):
-    df = pd.read_csv(label_csv_path)
+# pydub AudioSegment의 raw_data 샘플 형식 (8bit도 signed) -> ffmpeg raw 입력 형식
+RAW_FORMATS = {1: 's8', 2: 's16le', 3: 's24le', 4: 's32le'}
+# AudioSegment.silent 기본 형식. 세그먼트에 무음만 있으면 이 형식으로 씀 (기존과 동일)
+SILENT_FORMAT = (11025, 1, 2)
+STREAM_CHUNK_SECONDS = 30
+# --codec 값 -> (ffmpeg 인코더, 출력 형식, 확장자). opus/aac는 웹에 올리는 작은 파일용
+CODECS = {
+    'mp3': ('libmp3lame', 'mp3', 'mp3'),
+    'opus': ('libopus', 'ogg', 'opus'),
+    'aac': ('aac', 'ipod', 'm4a'),
+}
+
+
+def output_path(output_dir, seg_num, codec='mp3'):
+    return os.path.join(output_dir, f"merged_segment_{seg_num}.{CODECS[codec][2]}")
+
+
+class StreamingEncoder:
+    """merged_segment 하나를 ffmpeg stdin으로 raw PCM을 흘려보내며 인코딩 (codec: CODECS 키, bitrate: 예 '64k').
+
+    샘플 형식(frame_rate, channels, sample_width)은 처음 들어오는 오디오로 정하고,
+    그 전에 나온 무음은 길이만 기억해 두었다가 형식이 정해지면 0 바이트로 씀.
+    """
+
+    def __init__(self, out_path, audio_format=None, codec='mp3', bitrate=None):
+        self.out_path = out_path
+        self.audio_format = audio_format
+        self.codec = codec
+        self.bitrate = bitrate
+        self.proc = None
+        self.pending_silence_ms = 0
+
+    def _open(self):
+        frame_rate, channels, sample_width = self.audio_format
+        encoder, muxer, _ = CODECS[self.codec]
+        command = [
+            'ffmpeg', '-nostdin', '-v', 'error', '-y',
+            '-f', RAW_FORMATS[sample_width], '-ar', str(frame_rate), '-ac', str(channels),
+            '-i', 'pipe:0',
+            '-c:a', encoder,
+        ]
+        if self.bitrate:
+            command += ['-b:a', self.bitrate]
+        command += ['-f', muxer, self.out_path]
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+        silence_ms, self.pending_silence_ms = self.pending_silence_ms, 0
+        self.write_silence(silence_ms)
+
+    def write_raw(self, data, audio_format=None):
+        if self.proc is None:
+            self.audio_format = self.audio_format or audio_format
+            self._open()
+        self.proc.stdin.write(data)
+
+    def write_audio(self, audio):
+        """AudioSegment를 인코더 형식으로 맞춰서 씀 (pydub의 += 와 같은 변환)."""
+        if self.proc is None and self.audio_format is None:
+            self.audio_format = (audio.frame_rate, audio.channels, audio.sample_width)
+        frame_rate, channels, sample_width = self.audio_format
+        audio = audio.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(sample_width)
+        self.write_raw(audio.raw_data)
+
+    def write_silence(self, duration_ms):
+        """무음은 버퍼를 만들지 않고 0 바이트를 조금씩 씀."""
+        if duration_ms <= 0:
+            return
+        if self.proc is None:
+            self.pending_silence_ms += duration_ms
+            return
+        frame_rate, channels, sample_width = self.audio_format
+        remaining = int(duration_ms * frame_rate / 1000.0) * channels * sample_width
+        chunk = bytes(min(remaining, STREAM_CHUNK_SECONDS * frame_rate * channels * sample_width))
+        while remaining > 0:
+            self.proc.stdin.write(chunk[:remaining])
+            remaining -= len(chunk)
+
+    def close(self):
+        if self.proc is None:
+            self.audio_format = self.audio_format or SILENT_FORMAT
+            self._open()
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to encode {self.out_path}")
+
+
+# 내보내기 워커가 fork로 물려받는 입력 (timeline, pcm memmap, slicer 등). pickle로 복사하지 않으려고 전역에 둠
+_export_state = {}
+
+
+def export_all(export_fn, jobs, workers, state):
+    """jobs [(seg_num, ...)]를 export_fn으로 내보냄. workers > 1이면 프로세스 풀에서 병렬 인코딩.
+
+    결과는 제출 순서(Segment ID 순서)대로 모아서 출력하므로 로그와 파일 목록이 워커 수와 무관하게 같음.
+    """
+    global _export_state
+    _export_state = state
+    if workers <= 1:
+        for job in jobs:
+            print(f"Saved {export_fn(*job)}")
+        return
+    # merge_mp3.py는 스크립트로 실행되므로 asr_pool.py와 같이 fork 사용 (memmap도 그대로 공유)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        futures = [pool.submit(export_fn, *job) for job in jobs]
+        for future in futures:
+            print(f"Saved {future.result()}")
+
+
+def merge_segments(label_csv_path, segment_dir, output_dir, pcm=None, slicer=None, workers=1, codec='mp3', bitrate=None):
+    timeline = Timeline.read_csv(label_csv_path)
     os.makedirs(output_dir, exist_ok=True)
 
-    merged_segments = {}
-    for seg_num in df['Segment'].unique():
-        merged_segments[seg_num] = AudioSegment.empty()
+    # Segment ID별 행 번호 (처음 나온 순서, ID 안에서는 행 순서). 한 번에 세그먼트 하나만 인코딩함
+    rows_by_segment = {}
+    for idx, seg_num in enumerate(timeline.columns['Segment']):
+        rows_by_segment.setdefault(seg_num, []).append(idx)
 
-    # 파일 인덱스 카운터 초기화 (외부 스크립트와의 순서 일치 확인 필요)
-    # 현재 코드는 idx + 1 을 사용하므로 그대로 유지합니다.
-    
-    for idx, row in df.iterrows():
-        label = row['labels']
-        seg_num = row['Segment']
-        start = row['start']
-        stop = row['stop']
-        duration_ms = (stop - start) * 1000
-
-        # idx + 1을 사용하므로, 0부터 시작하는 파일 생성 스크립트와 맞지 않을 수 있습니다.
-        # 만약 파일 이름이 0부터 시작한다면 file_index = idx로 수정해야 합니다.
-        file_index = idx + 1 
-        file_name = f"{label}_output_segment_{file_index}.mp3"
-        file_path = os.path.join(segment_dir, file_name)
-
-        if label == 'silence':
-            silence = AudioSegment.silent(duration=duration_ms)
-            merged_segments[seg_num] += silence
-            continue
+    # Segment ID가 0이 아닌 것만 저장
+    jobs = [(int(seg_num), rows) for seg_num, rows in rows_by_segment.items() if seg_num > 0]
+    state = dict(timeline=timeline, segment_dir=segment_dir, output_dir=output_dir,
+                 pcm=pcm, slicer=slicer, codec=codec, bitrate=bitrate)
+    export_all(_export_rows, jobs, workers, state)
+
+
+def _export_rows(seg_num, rows):
+    state = _export_state
+    pcm = state['pcm']
+    pcm_format = (pcm.sample_rate, pcm.channels, pcm.samples.dtype.itemsize) if pcm is not None else None
+    out_path = output_path(state['output_dir'], seg_num, state['codec'])
+    encoder = StreamingEncoder(out_path, pcm_format, state['codec'], state['bitrate'])
+    try:
+        for idx in rows:
+            append_row(encoder, state['timeline'][idx], idx, state['segment_dir'], pcm, state['slicer'])
+    finally:
+        encoder.close()
+    return out_path
+
+
+def append_row(encoder, row, idx, segment_dir, pcm=None, slicer=None):
+    label = row.label
+    start = row.start
+    stop = row.stop
+
+    # idx + 1을 사용하므로, 0부터 시작하는 파일 생성 스크립트와 맞지 않을 수 있습니다.
+    # 만약 파일 이름이 0부터 시작한다면 file_index = idx로 수정해야 합니다.
+    file_index = idx + 1
+    file_name = f"{label}_output_segment_{file_index}.mp3"
+    file_path = os.path.join(segment_dir, file_name)
 
-        if os.path.exists(file_path):
-            try:
-                audio = AudioSegment.from_file(file_path)
-                merged_segments[seg_num] += audio
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
+    if label == 'silence':
+        encoder.write_silence(row.duration_ms)
+        return
+
+    # make_piece.py가 조각 파일을 만들지 않는 play 구간은 기존과 동일하게 제외
+    if (pcm is not None or slicer is not None) and label == 'play':
+        return
+
+    if pcm is not None:
+        # memmap에서 STREAM_CHUNK_SECONDS씩 잘라서 바로 인코더로 보냄
+        chunk_start = start
+        while chunk_start < stop:
+            chunk_stop = min(stop, chunk_start + STREAM_CHUNK_SECONDS)
+            encoder.write_raw(pcm.read_bytes(chunk_start, chunk_stop))
+            chunk_start = chunk_stop
+        return
+
+    if slicer is not None:
+        # 조각 파일 대신 원본 mp3에서 프레임 단위 byte range를 바로 읽음
+        data = slicer.read(start, stop)
+        if len(data):
+            encoder.write_audio(AudioSegment.from_file(BytesIO(data.tobytes()), format='mp3'))
+        return
+
+    if os.path.exists(file_path):
+        try:
+            audio = AudioSegment.from_file(file_path)
+        except Exception as e:
+            print(f"Error reading {file_path}: {e}")
+            return
+        encoder.write_audio(audio)
+    else:
+        print(f"Missing file: {file_path}")
+
+def plan_ranges(timeline):
+    """Segment ID별로 최종 출력할 구간 목록 {ID: [[kind, start_ms, stop_ms], ...]} (kind: 'audio'/'silence').
+
+    조각 파일 번호 대신 label CSV의 시간만 사용함. play 행은 제외하고,
+    같은 종류의 구간이 끊김 없이 이어지면 하나로 합쳐서 원본을 읽는 횟수를 줄임.
+    """
+    plan = {}
+    for row, seg_num in zip(timeline.records(), timeline.columns['Segment']):
+        ranges = plan.setdefault(int(seg_num), [])
+        if row.label == 'play' or row.duration_ms <= 0:
+            continue
+        kind = 'silence' if row.label == 'silence' else 'audio'
+        if ranges and ranges[-1][0] == kind and ranges[-1][2] == row.start_ms:
+            ranges[-1][2] = row.stop_ms
         else:
-            print(f"Missing file: {file_path}")
+            ranges.append([kind, row.start_ms, row.stop_ms])
+    return plan
+
+
+# 원본 mp3를 한 번에 디코딩할 때의 PCM 형식 (frame_rate, channels, sample_width)
+DECODE_FORMAT = (44100, 2, 2)
+
+
+class SourceDecoder:
+    """원본 mp3를 ffmpeg로 처음부터 끝까지 한 번만 디코딩하며 시간순으로 구간을 읽음 (되돌아가지 않음)."""
+
+    def __init__(self, mp3_file, audio_format=DECODE_FORMAT, offset_ms=0):
+        self.audio_format = audio_format
+        frame_rate, channels, sample_width = audio_format
+        self.frame_size = channels * sample_width
+        self.frame_rate = frame_rate
+        # offset_ms부터 디코딩 시작 (병렬 내보내기에서 워커마다 자기 구간부터 읽음)
+        self.position = self._frames(offset_ms)
+        command = [
+            'ffmpeg', '-nostdin', '-v', 'error',
+            '-ss', f"{offset_ms / 1000.0:.3f}",
+            '-i', mp3_file,
+            '-f', RAW_FORMATS[sample_width], '-ac', str(channels), '-ar', str(frame_rate),
+            '-',
+        ]
+        self.proc = subprocess.Popen(command, stdout=subprocess.PIPE)
+
+    def _frames(self, ms):
+        return int(ms * self.frame_rate / 1000)
+
+    def read(self, start_ms, stop_ms):
+        """[start_ms, stop_ms) 구간을 STREAM_CHUNK_SECONDS 단위 bytes로 내보냄. 이미 지나간 부분은 건너뜀."""
+        chunk_frames = STREAM_CHUNK_SECONDS * self.frame_rate
+        skip = self._frames(start_ms) - self.position
+        while skip > 0:
+            data = self.proc.stdout.read(min(skip, chunk_frames) * self.frame_size)
+            if not data:
+                return
+            self.position += len(data) // self.frame_size
+            skip -= len(data) // self.frame_size
+        remaining = self._frames(stop_ms) - self.position
+        while remaining > 0:
+            data = self.proc.stdout.read(min(remaining, chunk_frames) * self.frame_size)
+            if not data:
+                return
+            self.position += len(data) // self.frame_size
+            remaining -= len(data) // self.frame_size
+            yield data
+
+    def close(self):
+        self.proc.stdout.close()
+        self.proc.wait()
+
+
+def write_range(encoder, kind, start_ms, stop_ms, pcm=None, decoder=None):
+    if kind == 'silence':
+        encoder.write_silence(stop_ms - start_ms)
+    elif decoder is not None:
+        for data in decoder.read(start_ms, stop_ms):
+            encoder.write_raw(data)
+    else:
+        chunk_ms = STREAM_CHUNK_SECONDS * 1000
+        for chunk_start in range(start_ms, stop_ms, chunk_ms):
+            encoder.write_raw(pcm.read_bytes(chunk_start / 1000.0, min(stop_ms, chunk_start + chunk_ms) / 1000.0))
+
+
+def render_ranges(label_csv_path, output_dir, pcm=None, source_mp3=None, workers=1, codec='mp3', bitrate=None):
+    """plan_ranges의 구간을 PCM 캐시(memmap) 또는 원본 mp3 한 번 디코딩에서 바로 읽어 merged_segment_{ID}로 씀.
+
+    workers가 1이면 모든 ID의 구간을 시간순으로 한 번만 훑고, 인코더는 해당 ID의 마지막 구간을 쓰면 바로 닫음.
+    workers > 1이면 ID마다 워커 하나가 인코딩함 (원본 mp3는 워커마다 그 ID의 첫 구간부터 디코딩).
+    """
+    plan = plan_ranges(Timeline.read_csv(label_csv_path))
+    os.makedirs(output_dir, exist_ok=True)
+    # Segment ID가 0이 아닌 것만 저장. play 행만 있는 ID도 기존처럼 (빈) 파일을 만듦
+    plan = {seg_num: ranges for seg_num, ranges in plan.items() if seg_num > 0}
+
+    if workers > 1:
+        state = dict(output_dir=output_dir, pcm=pcm, source_mp3=source_mp3, codec=codec, bitrate=bitrate)
+        export_all(_export_ranges, list(plan.items()), workers, state)
+        return
+
+    if pcm is not None:
+        decoder = None
+        audio_format = (pcm.sample_rate, pcm.channels, pcm.samples.dtype.itemsize)
+    else:
+        decoder = SourceDecoder(source_mp3)
+        audio_format = decoder.audio_format
+
+    events = []
+    for seg_num, ranges in plan.items():
+        if not ranges:
+            events.append((-1, seg_num, None, 0, 0, True))
+        for i, (kind, start_ms, stop_ms) in enumerate(ranges):
+            events.append((start_ms, seg_num, kind, start_ms, stop_ms, i == len(ranges) - 1))
+    events.sort(key=lambda event: event[0])
+
+    encoders = {}
+    try:
+        for _, seg_num, kind, start_ms, stop_ms, last in events:
+            if seg_num not in encoders:
+                encoders[seg_num] = StreamingEncoder(output_path(output_dir, seg_num, codec), audio_format, codec, bitrate)
+            encoder = encoders[seg_num]
+            if kind is not None:
+                write_range(encoder, kind, start_ms, stop_ms, pcm, decoder)
+            if last:
+                encoders.pop(seg_num).close()
+                print(f"Saved {encoder.out_path}")
+    finally:
+        for encoder in encoders.values():
+            encoder.close()
+        if decoder is not None:
+            decoder.close()
+
+
+def _export_ranges(seg_num, ranges):
+    state = _export_state
+    pcm = state['pcm']
+    decoder = None
+    if pcm is not None:
+        audio_format = (pcm.sample_rate, pcm.channels, pcm.samples.dtype.itemsize)
+    else:
+        audio_starts = [start_ms for kind, start_ms, _ in ranges if kind == 'audio']
+        decoder = SourceDecoder(state['source_mp3'], offset_ms=audio_starts[0] if audio_starts else 0)
+        audio_format = decoder.audio_format
+    out_path = output_path(state['output_dir'], seg_num, state['codec'])
+    encoder = StreamingEncoder(out_path, audio_format, state['codec'], state['bitrate'])
+    try:
+        for kind, start_ms, stop_ms in ranges:
+            write_range(encoder, kind, start_ms, stop_ms, pcm, decoder)
+    finally:
+        encoder.close()
+        if decoder is not None:
+            decoder.close()
+    return out_path
 
-    for seg_num, audio in merged_segments.items():
-        if seg_num > 0: # Segment ID가 0이 아닌 것만 저장
-            out_path = os.path.join(output_dir, f"merged_segment_{seg_num}.mp3")
-            audio.export(out_path, format="mp3")
-            print(f"Saved {out_path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="특정 라디오 방송의 세그먼트를 병합")
@@ -144,6 +397,13 @@ if __name__ == "__main__":
     parser.add_argument('--date', type=str, required=True, help='날짜 (예: 250510)')
     parser.add_argument('--time', type=str, required=True, help='방송 시간 (예: 1400)')
     parser.add_argument('--station', type=str, required=True, help='방송국 이름 (예: kbs2fm)')
+    parser.add_argument('--pcm_cache', type=str, default=None, help='pcm_cache.py로 만든 PCM 캐시. 지정하면 조각 mp3 대신 캐시에서 구간을 읽음 (ASR용 16kHz mono 캐시는 --allow_asr_rate 필요)')
+    parser.add_argument('--allow_asr_rate', action='store_true', help='--pcm_cache가 ASR용 16kHz mono 캐시여도 사용. 출력 음질이 16kHz mono로 떨어지므로 미리듣기/테스트용으로만 사용')
+    parser.add_argument('--source_mp3', type=str, default=None, help='원본 방송 mp3. 지정하면 조각 mp3 대신 프레임 인덱스(mp3_index.py)로 원본에서 구간을 잘라 읽음')
+    parser.add_argument('--workers', type=int, default=1, help='merged_segment 인코딩 워커 프로세스 수 (Segment ID 단위로 병렬 처리).')
+    parser.add_argument('--codec', choices=sorted(CODECS), default='mp3', help='출력 코덱. opus(.opus)/aac(.m4a)는 웹용 작은 파일')
+    parser.add_argument('--bitrate', type=str, default=None, help="출력 비트레이트 (예: 64k). 지정하지 않으면 ffmpeg 기본값")
+    parser.add_argument('--render_ranges', action='store_true', help='--pcm_cache/--source_mp3와 함께 사용. 행 단위 조각 대신 Segment ID별 최종 구간을 계산해서 캐시 또는 원본을 한 번만 훑으며 병합')
     args = parser.parse_args()
 
     date_str = args.date
@@ -174,8 +434,24 @@ if __name__ == "__main__":
         print(f"[skip] 파일 없음: {noenergy_csv} 또는 {summary_txt}")
     else:
         # 1. 라벨 CSV 생성
-        df_labeled = create_label_csv(noenergy_csv, summary_txt, label_csv)
+        labeled = create_label_csv(noenergy_csv, summary_txt, label_csv)
 
-        if df_labeled is not None:
+        if labeled is not None:
             # 2. 병합 수행
-            merge_segments(label_csv, segment_dir, play_dir)
\ No newline at end of file
+            pcm = None
+            slicer = None
+            if args.pcm_cache:
+                from pcm_cache import PcmCache, SAMPLE_RATE, CHANNELS
+                pcm = PcmCache(args.pcm_cache)
+                # ASR용 캐시로 병합하면 청취용 merged_segment가 모두 16kHz mono가 되므로 명시적으로 허용한 경우에만 사용
+                if pcm.sample_rate <= SAMPLE_RATE and pcm.channels <= CHANNELS and not args.allow_asr_rate:
+                    print(f"🚨 오류: {args.pcm_cache}는 ASR용 {pcm.sample_rate}Hz/{pcm.channels}ch 캐시입니다. "
+                          f"--source_mp3를 쓰거나 --allow_asr_rate를 지정하세요.")
+                    exit(1)
+            if args.render_ranges and (pcm is not None or args.source_mp3):
+                render_ranges(label_csv, play_dir, pcm, args.source_mp3, args.workers, args.codec, args.bitrate)
+            else:
+                if pcm is None and args.source_mp3:
+                    from mp3_index import Mp3Slicer
+                    slicer = Mp3Slicer(args.source_mp3)
+                merge_segments(label_csv, segment_dir, play_dir, pcm, slicer, args.workers, args.codec, args.bitrate)
@@ -0,0 +1,159 @@
+import os
+import mmap
+import argparse
+
+import numpy as np
+
+# MP3 프레임 단위 인덱스: 프레임마다 (byte offset, 시작 sample)을 기록해서
+# 디코딩 없이 원본을 memmap한 뒤 프레임 경계로 byte range를 복사해서 자를 수 있게 함.
+# 녹음 파일 옆에 <mp3>.idx.npz 로 저장 (2시간 방송 ≈ 27만 프레임 ≈ 4MB).
+
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('pts', '<u8')])
+
+
+def index_path_for(mp3_file):
+    return mp3_file + '.idx.npz'
+
+
+def parse_header(data, pos):
+    """pos 위치의 MPEG audio 프레임 헤더를 읽어서 (frame_length, samples, sample_rate) 반환. 아니면 None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2 = data[pos + 1], data[pos + 2]
+    version = {3: 1, 2: 2, 0: 25}.get((b1 >> 3) & 0x03)
+    layer = {3: 1, 2: 2, 1: 3}.get((b1 >> 1) & 0x03)
+    bitrate_index = (b2 >> 4) & 0x0F
+    rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and version != 1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+
+def is_info_frame(data, pos, length):
+    """LAME가 맨 앞에 넣는 Xing/Info 프레임은 오디오가 아니므로 인덱스에서 제외."""
+    frame = bytes(data[pos:pos + min(length, 64)])
+    return b'Xing' in frame or b'Info' in frame or b'VBRI' in frame
+
+
+def id3v2_size(data):
+    if len(data) < 10 or bytes(data[:3]) != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+class Mp3Index:
+    def __init__(self, frames, sample_rate, end_offset):
+        self.frames = frames
+        self.sample_rate = sample_rate
+        self.end_offset = end_offset
+        self.times = frames['pts'] / float(sample_rate)
+
+    @classmethod
+    def build(cls, mp3_file):
+        offsets, pts = [], []
+        sample_rate = None
+        total = 0
+        with open(mp3_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            if size >= 128 and bytes(data[size - 128:size - 125]) == b'TAG':
+                size -= 128
+            pos = id3v2_size(data)
+            first = True
+            while pos + 4 <= size:
+                header = parse_header(data, pos)
+                # 잘못된 sync(데이터 안의 우연한 0xFFE)를 피하려고 다음 프레임 헤더까지 확인
+                if header is None or (pos + header[0] < size and parse_header(data, pos + header[0]) is None):
+                    pos += 1
+                    continue
+                length, samples, rate = header
+                if first and is_info_frame(data, pos, length):
+                    first = False
+                    pos += length
+                    continue
+                first = False
+                sample_rate = sample_rate or rate
+                offsets.append(pos)
+                pts.append(total)
+                total += samples
+                pos += length
+            end_offset = min(pos, size)
+        frames = np.empty(len(offsets), dtype=INDEX_DTYPE)
+        frames['offset'] = offsets
+        frames['pts'] = pts
+        return cls(frames, sample_rate or 44100, end_offset)
+
+    def save(self, path):
+        np.savez(path, frames=self.frames, sample_rate=self.sample_rate, end_offset=self.end_offset)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['frames'], int(data['sample_rate']), int(data['end_offset']))
+
+    def byte_range(self, start, stop):
+        """[start, stop) 초 구간을 덮는 프레임들의 byte range. 경계는 가장 가까운 프레임 시작으로 맞춤."""
+        first = int(np.searchsorted(self.times, float(start) - 0.5 * self.frame_duration))
+        last = int(np.searchsorted(self.times, float(stop) - 0.5 * self.frame_duration))
+        begin = int(self.frames['offset'][first]) if first < len(self.frames) else self.end_offset
+        end = int(self.frames['offset'][last]) if last < len(self.frames) else self.end_offset
+        return begin, max(begin, end)
+
+    @property
+    def frame_duration(self):
+        if len(self.frames) < 2:
+            return 0.0
+        return float(self.times[1] - self.times[0])
+
+
+def load_index(mp3_file, rebuild=False):
+    """sidecar 인덱스가 있으면 읽고, 없거나 원본보다 오래됐으면 새로 만들어 저장."""
+    path = index_path_for(mp3_file)
+    if not rebuild and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(mp3_file):
+        return Mp3Index.load(path)
+    index = Mp3Index.build(mp3_file)
+    index.save(path)
+    print(f"Indexed {len(index.frames)} frames of {mp3_file} -> {path}")
+    return index
+
+
+class Mp3Slicer:
+    """원본 mp3를 memmap으로 열어두고 프레임 경계의 byte range를 그대로 잘라냄 (디코딩 없음)."""
+
+    def __init__(self, mp3_file, index=None):
+        self.mp3_file = mp3_file
+        self.index = index or load_index(mp3_file)
+        self.data = np.memmap(mp3_file, dtype=np.uint8, mode='r')
+
+    def read(self, start, stop):
+        begin, end = self.index.byte_range(start, stop)
+        return self.data[begin:end]
+
+    def cut(self, start, stop, output_file):
+        with open(output_file, 'wb') as f:
+            f.write(self.read(start, stop))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the MP3 frame index sidecar (<mp3>.idx.npz) for a recording.')
+    parser.add_argument('--mp3_file', required=True, help='Path to the broadcast mp3.')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild even if the sidecar is up to date.')
+    args = parser.parse_args()
+    load_index(args.mp3_file, args.rebuild)
@@ -0,0 +1,107 @@
+import os
+import struct
+import argparse
+import subprocess
+
+import numpy as np
+
+# 방송 mp3를 한 번만 디코딩해서 16kHz mono 16bit PCM으로 저장해두고,
+# 세그먼트 분리/전사/병합 단계가 모두 이 파일을 memmap으로 읽어서 사용함.
+# 헤더는 표준 44바이트 WAV 헤더라서 ina_speech_segmenter, whisper, pydub에서도 그대로 열 수 있음.
+SAMPLE_RATE = 16000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+HEADER_SIZE = 44
+CHUNK_SIZE = 1 << 20
+
+
+def cache_path_for(mp3_file):
+    """/input/<date>/<station>-<time>.mp3 -> /input/<date>/<station>-<time>.16k.wav"""
+    return os.path.splitext(mp3_file)[0] + '.16k.wav'
+
+
+def wav_header(data_size, sample_rate=SAMPLE_RATE, channels=CHANNELS, sample_width=SAMPLE_WIDTH):
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+        b'data', data_size,
+    )
+
+
+def build_pcm_cache(mp3_file, cache_file=None, force=False):
+    """mp3_file을 한 번 디코딩해서 캐시 파일을 만들고 경로를 반환. 이미 있으면 재사용."""
+    cache_file = cache_file or cache_path_for(mp3_file)
+    if not force and os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(mp3_file):
+        return cache_file
+
+    command = [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-i', mp3_file,
+        '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ac', str(CHANNELS), '-ar', str(SAMPLE_RATE),
+        '-',
+    ]
+    tmp_file = cache_file + '.tmp'
+    data_size = 0
+    with open(tmp_file, 'wb') as f:
+        f.write(wav_header(0))
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE)
+        while True:
+            chunk = proc.stdout.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            data_size += len(chunk)
+        if proc.wait() != 0:
+            f.close()
+            os.remove(tmp_file)
+            raise RuntimeError(f"ffmpeg failed to decode {mp3_file}")
+        f.seek(0)
+        f.write(wav_header(data_size))
+    os.replace(tmp_file, cache_file)
+    print(f"Decoded {mp3_file} -> {cache_file} ({data_size / (SAMPLE_RATE * SAMPLE_WIDTH):.1f}s)")
+    return cache_file
+
+
+class PcmCache:
+    """캐시 파일을 memmap으로 열어서 초 단위 구간을 복사 없이 읽음."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        riff, _, wave, fmt, _, _, channels, sample_rate, _, _, bits, data, data_size = struct.unpack('<4sI4s4sIHHIIHH4sI', header)
+        if riff != b'RIFF' or wave != b'WAVE' or data != b'data' or bits != SAMPLE_WIDTH * 8:
+            raise ValueError(f"{path} is not a PCM cache file")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.samples = np.memmap(path, dtype='<i2', mode='r', offset=HEADER_SIZE, shape=(data_size // SAMPLE_WIDTH,))
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def index(self, seconds):
+        return min(max(int(round(float(seconds) * self.sample_rate)), 0), len(self.samples))
+
+    def read(self, start, stop):
+        """[start, stop) 초 구간의 int16 샘플 view (복사 없음)."""
+        return self.samples[self.index(start):self.index(stop)]
+
+    def read_float(self, start, stop):
+        """whisper 입력용 float32 [-1, 1] 배열."""
+        return self.read(start, stop).astype(np.float32) / 32768.0
+
+    def read_bytes(self, start, stop):
+        return self.read(start, stop).tobytes()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Decode a broadcast mp3 once into a shared 16 kHz mono PCM cache.')
+    parser.add_argument('--mp3_file', required=True, help='Path to the broadcast mp3, e.g. /input/240615/mbc-0900.mp3')
+    parser.add_argument('--cache_file', default=None, help='Output path (default: <mp3 without ext>.16k.wav)')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the cache is up to date.')
+    args = parser.parse_args()
+    print(build_pcm_cache(args.mp3_file, args.cache_file, args.force))
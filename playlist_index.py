@@ -0,0 +1,78 @@
+import bisect
+
+from timeline import clock_to_ms, duration_to_ms
+
+# make_piece.py의 playlist 조회용 정렬 인덱스.
+# playlist를 한 번만 시간순으로 정렬해 두고 세그먼트 행마다 전체 곡을 다시 훑지 않고 bisect로 찾음.
+#  - kbs2fm/sbs (Time 있음): 곡 구간으로 행 쪼개기, start에 가장 가까운 곡 찾기
+#  - mbc (Time 없음): playlist 순서대로 한 곡씩 꺼내기, 식별된 곡 위치로 커서 맞추기
+
+
+class PlaylistIndex:
+    def __init__(self, playlist, broadcast_start_ms):
+        self.playlist = playlist
+        self.cursor = 0
+
+        # (방송 시작 기준 ms, playlist 위치) - Time이 있는 곡 전부
+        timed = []
+        # (start ms, end ms, playlist 위치) - Time/Duration이 모두 있고 방송 시작 이후인 곡
+        intervals = []
+        self.positions = {}
+        for pos, song in enumerate(playlist):
+            self.positions.setdefault((song.get('Artist'), song.get('Title')), pos)
+            song_time = song.get('Time')
+            if not song_time:
+                continue
+            start = clock_to_ms(song_time) - broadcast_start_ms
+            timed.append((start, pos))
+            duration = song.get('Duration') or song.get('DurationSec')
+            if duration and start >= 0:
+                intervals.append((start, start + duration_to_ms(duration), pos))
+
+        timed.sort()
+        self.times = [start for start, _ in timed]
+        self.time_positions = [pos for _, pos in timed]
+
+        # 같은 시각이면 playlist 순서. 시간순으로 적힌 playlist라면 기존 순회와 같은 순서가 됨
+        intervals.sort(key=lambda item: (item[0], item[2]))
+        self.starts = [start for start, _, _ in intervals]
+        self.ends = [end for _, end, _ in intervals]
+        # 곡 구간이 겹쳐도 bisect할 수 있게 end의 누적 최댓값을 사용
+        self.max_ends = []
+        for end in self.ends:
+            self.max_ends.append(max(end, self.max_ends[-1]) if self.max_ends else end)
+
+    def overlapping(self, start_ms, stop_ms):
+        """[start_ms, stop_ms)와 겹칠 수 있는 곡 구간 (start, end) 목록 (start 순)."""
+        lo = bisect.bisect_right(self.max_ends, start_ms)
+        hi = bisect.bisect_left(self.starts, stop_ms)
+        return list(zip(self.starts[lo:hi], self.ends[lo:hi]))
+
+    def nearest(self, start_ms):
+        """Time이 start_ms에 가장 가까운 곡. 거리가 같으면 playlist에서 앞에 있는 곡."""
+        if not self.times:
+            return None
+        i = bisect.bisect_left(self.times, start_ms)
+        candidates = []
+        for j in (i - 1, i):
+            if 0 <= j < len(self.times):
+                # 같은 시각의 곡이 여러 개면 그중 playlist 위치가 가장 앞인 곡(정렬상 첫 번째)
+                first = bisect.bisect_left(self.times, self.times[j])
+                candidates.append((abs(start_ms - self.times[j]), self.time_positions[first]))
+        _, pos = min(candidates)
+        return self.playlist[pos]
+
+    def next_song(self):
+        """MBC: play 구간이 나올 때마다 playlist 순서대로 다음 곡."""
+        if self.cursor >= len(self.playlist):
+            return None
+        song = self.playlist[self.cursor]
+        self.cursor += 1
+        return song
+
+    def seek_after(self, artist, title):
+        """식별된 곡이 playlist에 있으면 다음 next_song()이 그 다음 곡을 돌려주도록 커서를 옮김."""
+        pos = self.positions.get((artist, title))
+        if pos is not None:
+            self.cursor = pos + 1
+        return pos
@@ -12,6 +12,10 @@ TIME=$3
 
 # 날짜 설정
 INPUT_FILE="/home/dnlab/input/$DATE/$STATION-$TIME.mp3"
+PCM_CACHE="/home/dnlab/input/$DATE/$STATION-$TIME.16k.wav"
+TRANSCRIPT_CACHE="/home/dnlab/cache/transcripts.sqlite"
+FINGERPRINT_DB="/home/dnlab/cache/fingerprints.sqlite"
+SONG_INDEX="/home/dnlab/cache/song_index.npz"
 PROCESSED_DIR="/home/dnlab/processed/$DATE/$STATION-$TIME"
 
 if [ -z "$INPUT_FILE" ]; then
@@ -23,13 +27,20 @@ fi
 
 source ~/anaconda3/etc/profile.d/conda.sh
 
+# Step 0: pcm_cache.py 실행 (segment 환경) - mp3를 한 번만 16kHz PCM으로 디코딩
+conda activate segment
+echo "[0] Process pcm_cache.py"
+python /home/dnlab/Project/modify_process/pcm_cache.py --mp3_file "$INPUT_FILE" --cache_file "$PCM_CACHE"
+echo "[0] Done"
+conda deactivate
+
 # Step 1: ina-script.py 실행 (segment 환경)
 conda activate segment
 echo "[1] activate segment"
 mkdir -p "$PROCESSED_DIR"
 echo "[1] make dir $PROCESSED_DIR"
 echo "[1] Process ina-script.py"
-python /home/dnlab/Project/modify_process/ina-script.py --input_mp3_file "$INPUT_FILE" --output_dir "$PROCESSED_DIR" --date "$DATE" --time "$TIME"
+python /home/dnlab/Project/modify_process/ina-script.py --input_mp3_file "$INPUT_FILE" --output_dir "$PROCESSED_DIR" --date "$DATE" --time "$TIME" --pcm_cache "$PCM_CACHE"
 echo "[1] Done"
 conda deactivate
 
@@ -43,30 +54,47 @@ conda deactivate
 # # Step 2-2: modify-script.py 실행 (segment 환경)
 conda activate segment
 echo "[2-2] Process modify-script.py"
-python /home/dnlab/Project/modify_process/modify-script.py --date "$DATE" --station "$STATION" --time "$TIME"
+python /home/dnlab/Project/modify_process/modify-script.py --date "$DATE" --station "$STATION" --time "$TIME" --song_index "$SONG_INDEX" --pcm_cache "$PCM_CACHE"
 echo "[2-2] Done"
 conda deactivate
 
-# Step 3: make_piece.py 실행 (whisper 환경)
+# Step 3 + 4: make_piece.py 실행 (whisper 환경) + summarize.py --follow (summary 환경)
+# summarize.py는 make_piece.py의 journal을 따라가며 구간이 닫히는 대로 요약하므로 두 단계를 함께 실행
+SEGMENTS_INFO="$PROCESSED_DIR/transcripts/segments_info.csv"
+rm -f "$SEGMENTS_INFO.journal"
+echo "[4] Process summarize.py (follow)"
+# $!는 conda run wrapper의 PID라서, setsid로 새 프로세스 그룹을 만들어 두고 실패 시 그룹 전체(python 자식 포함)를 종료함
+setsid conda run --no-capture-output -n summary python /home/dnlab/Project/modify_process/summarize.py --follow --csv_file "$SEGMENTS_INFO" --output_file "$PROCESSED_DIR/transcripts/summary.txt" &
+SUMMARIZE_PID=$!
+
 conda activate whisper
 echo "[3] activate whisper"
 echo "[3] Process make_piece.py"
-python /home/dnlab/Project/modify_process/make_piece.py --mp3_file "$INPUT_FILE" --output_base_dir "$PROCESSED_DIR" --date "$DATE" --time "$TIME" --station "$STATION"
+python /home/dnlab/Project/modify_process/make_piece.py --mp3_file "$INPUT_FILE" --output_base_dir "$PROCESSED_DIR" --date "$DATE" --time "$TIME" --station "$STATION" --pcm_cache "$PCM_CACHE" --transcript_cache "$TRANSCRIPT_CACHE" --fingerprint_db "$FINGERPRINT_DB" --song_index "$SONG_INDEX"
+MAKE_PIECE_STATUS=$?
 echo "[3] Done"
 conda deactivate
 
-# Step 4: summarize.py 실행 (summary 환경)
-conda activate summary
-echo "[4] activate summary"
-echo "[4] Process summarize.py"
-python /home/dnlab/Project/modify_process/summarize.py --csv_file "$PROCESSED_DIR/transcripts/segments_info.csv" --output_file "$PROCESSED_DIR/transcripts/summary.txt"
+if [ $MAKE_PIECE_STATUS -ne 0 ]; then
+    # 입력이 없어서 건너뛴 경우에도 0이 아닌 값으로 끝남. summarize.py는 기다리지 않고 종료시킴
+    kill -- -$SUMMARIZE_PID 2>/dev/null
+    echo "make_piece.py failed"
+    exit 1
+fi
+# summarize.py는 journal의 완료 표시를 보고 끝나고, 표시 없이 --idle_timeout 동안 journal이 멈추면 실패로 끝남
+wait $SUMMARIZE_PID
+SUMMARIZE_STATUS=$?
+if [ $SUMMARIZE_STATUS -ne 0 ]; then
+    echo "summarize.py failed"
+    exit 1
+fi
 echo "[4] Done"
-conda deactivate
 
 # Step 5: merge_mp3.py 실행 (segment 환경)
+# PCM 캐시는 ASR용 16kHz mono라서 청취용 merged_segment에는 쓰지 않고 원본 mp3 프레임을 그대로 잘라 씀
 conda activate segment
 echo "[5] Process merge_mp3.py"
-python /home/dnlab/Project/modify_process/merge_mp3.py --date $DATE --time $TIME --station $STATION
+python /home/dnlab/Project/modify_process/merge_mp3.py --date $DATE --time $TIME --station $STATION --source_mp3 "$INPUT_FILE"
 conda deactivate
 
 # Step 6: create_image.py 실행 (summary 환경)
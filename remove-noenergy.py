@@ -1,48 +1,15 @@
-import pandas as pd
 import sys
 import os
 import argparse
 
-def merge_no_energy_first(df):
-    merged_data = []
-    i = 0
-    while i < len(df):
-        current_row = df.iloc[i].copy()
-        if current_row['labels'] == 'noEnergy' or current_row['labels'] == 'noise':
-            if i < len(df) - 1:
-                next_row = df.iloc[i + 1].copy()
-                next_row['start'] = current_row['start']
-                merged_data.append(next_row)
-                i += 2
-            else:
-                merged_data.append(current_row)
-                i += 1
-        else:
-            merged_data.append(current_row)
-            i += 1
-    return pd.DataFrame(merged_data)
-
-def merge_rows(df):
-    merged_data = []
-    current_row = df.iloc[0].copy()
-    for i in range(1, len(df)):
-        next_row = df.iloc[i]
-        if current_row['stop'] - current_row['start'] <= 0:
-            if current_row['labels'] != next_row['labels']:
-                continue
-            current_row['stop'] = max(current_row['stop'], next_row['stop'])
-            current_row['labels'] = next_row['labels']
-        else:
-            merged_data.append(current_row.copy())
-            current_row = next_row.copy()
-    merged_data.append(current_row)
-    return pd.DataFrame(merged_data)
+from intervals import merge_no_energy_first, merge_rows
+from timeline import Timeline
 
 def process_file(input_file, output_file):
-    df = pd.read_csv(input_file, sep='\t')
-    df = merge_no_energy_first(df)
-    merged_df = merge_rows(df)
-    merged_df.to_csv(output_file, sep=',', index=False)
+    timeline = Timeline.read_csv(input_file, sep='\t')
+    timeline = merge_no_energy_first(timeline)
+    merged = merge_rows(timeline)
+    merged.write_csv(output_file)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Remove noEnergy/noise and merge segments for a specific file.')
@@ -0,0 +1,78 @@
+import os
+import csv
+import shutil
+import bisect
+import tempfile
+import subprocess
+
+# mp3 한 프레임(1152 samples @ 44.1kHz)이 약 26ms라서, 조각 경계는 그 정도 오차 안에서 맞춤
+TOLERANCE = 0.05
+
+
+def read_segment_list(list_file, piece_dir):
+    """ffmpeg segment muxer의 csv 목록 -> [(start, end, path), ...]"""
+    pieces = []
+    with open(list_file, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            pieces.append((float(row[1]), float(row[2]), os.path.join(piece_dir, row[0])))
+    pieces.sort()
+    return pieces
+
+
+def cut_one(input_file, start, stop, output_file):
+    """목록에서 조각을 찾지 못한 구간만 따로 자름 (-ss를 -i 앞에 둬서 처음부터 디코딩하지 않음)."""
+    command = [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-ss', str(start),
+        '-i', input_file,
+        '-t', str(stop - start),
+        '-c', 'copy',
+        output_file,
+        '-y'
+    ]
+    subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def split_segments(input_file, intervals):
+    """intervals: [(start, stop, output_file), ...] (초 단위).
+
+    ffmpeg segment muxer로 원본을 처음부터 끝까지 한 번만 읽으면서 모든 경계에서 자르고,
+    각 구간에 해당하는 조각을 output_file 이름으로 옮김. 구간 사이의 빈 조각은 버림.
+    """
+    boundaries = sorted({float(t) for start, stop, _ in intervals for t in (start, stop) if float(t) > 0})
+    out_dir = os.path.dirname(intervals[0][2]) or '.'
+    piece_dir = tempfile.mkdtemp(prefix='split_', dir=out_dir)
+    list_file = os.path.join(piece_dir, 'pieces.csv')
+    command = [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-i', input_file,
+        '-map', '0:a',
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_times', ','.join(str(t) for t in boundaries),
+        '-segment_list', list_file,
+        '-segment_list_type', 'csv',
+        '-reset_timestamps', '1',
+        os.path.join(piece_dir, 'piece_%06d.mp3'),
+        '-y'
+    ]
+    try:
+        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        pieces = read_segment_list(list_file, piece_dir) if os.path.exists(list_file) else []
+        piece_starts = [p[0] for p in pieces]
+
+        missing = 0
+        for start, stop, output_file in intervals:
+            start, stop = float(start), float(stop)
+            i = bisect.bisect_left(piece_starts, start - TOLERANCE)
+            if i < len(pieces) and abs(pieces[i][0] - start) <= TOLERANCE and abs(pieces[i][1] - stop) <= TOLERANCE \
+                    and os.path.exists(pieces[i][2]):
+                os.replace(pieces[i][2], output_file)
+            else:
+                cut_one(input_file, start, stop, output_file)
+                missing += 1
+        print(f"Split {input_file} into {len(intervals)} segments in one pass ({missing} cut separately)")
+    finally:
+        shutil.rmtree(piece_dir, ignore_errors=True)
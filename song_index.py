@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from timeline import SEGMENTS_INFO, Timeline
+
+# 이미 방송된 곡들의 chroma 지문 인덱스.
+# play 구간을 playlist 순서나 길이 규칙에 의존하지 않고 곡 자체로 식별하기 위해 사용함.
+# 곡마다 약 10초 길이의 chroma 창(12 pitch class x 8 step)을 1초 간격으로 저장하고,
+# 질의 구간은 0.5초 간격 창으로 나눠서 저장된 창과 시작 위치가 어긋나도 맞는 창이 생기게 함.
+# random hyperplane LSH로 후보를 찾은 뒤 cosine 유사도로 투표함.
+
+SAMPLE_RATE = 16000
+N_FFT = 4096
+HOP = 2048
+WINDOW_FRAMES = 80
+POOL_STEPS = 8
+INDEX_HOP_FRAMES = 8
+QUERY_HOP_FRAMES = 4
+LSH_TABLES = 12
+LSH_BITS = 10
+LSH_SEED = 20240615
+
+
+def chroma(audio):
+    """16kHz mono float32 -> (frames x 12) chroma."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < N_FFT:
+        return np.zeros((0, 12), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(audio, N_FFT)[::HOP]
+    power = np.abs(np.fft.rfft(frames * np.hanning(N_FFT).astype(np.float32), axis=1)) ** 2
+    freqs = np.fft.rfftfreq(N_FFT, 1.0 / SAMPLE_RATE)
+    valid = (freqs >= 100) & (freqs <= 5000)
+    pitch_class = np.round(12 * np.log2(freqs[valid] / 440.0) + 69).astype(int) % 12
+    mapping = np.zeros((valid.sum(), 12), dtype=np.float32)
+    mapping[np.arange(valid.sum()), pitch_class] = 1.0
+    result = np.log1p(power[:, valid] @ mapping)
+    norms = np.linalg.norm(result, axis=1, keepdims=True)
+    return result / np.maximum(norms, 1e-9)
+
+
+def windows(audio, hop_frames):
+    """chroma를 WINDOW_FRAMES 길이 창으로 나눠서 평균 풀링 -> 중심화/정규화된 (n x 96) 벡터."""
+    c = chroma(audio)
+    if len(c) < WINDOW_FRAMES:
+        return np.zeros((0, 12 * POOL_STEPS), dtype=np.float32)
+    starts = np.arange(0, len(c) - WINDOW_FRAMES + 1, hop_frames)
+    step = WINDOW_FRAMES // POOL_STEPS
+    vectors = np.stack([c[s:s + WINDOW_FRAMES].reshape(POOL_STEPS, step, 12).mean(axis=1).ravel() for s in starts])
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-9)).astype(np.float32)
+
+
+class SongIndex:
+    def __init__(self, vectors=None, song_ids=None, songs=None):
+        self.vectors = vectors if vectors is not None else np.zeros((0, 12 * POOL_STEPS), dtype=np.float32)
+        self.song_ids = song_ids if song_ids is not None else np.zeros(0, dtype=np.int32)
+        self.songs = songs or []
+        planes = np.random.default_rng(LSH_SEED).standard_normal((LSH_TABLES, 12 * POOL_STEPS, LSH_BITS)).astype(np.float32)
+        self.planes = planes
+        self.powers = (1 << np.arange(LSH_BITS)).astype(np.int64)
+        self.tables = None
+
+    def _signatures(self, vectors, table):
+        return ((vectors @ self.planes[table]) > 0).astype(np.int64) @ self.powers
+
+    def _build_tables(self):
+        self.tables = []
+        for table in range(LSH_TABLES):
+            keys = self._signatures(self.vectors, table)
+            order = np.argsort(keys, kind='stable')
+            self.tables.append((keys[order], order))
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            return cls(data['vectors'].astype(np.float32), data['song_ids'], json.loads(str(data['songs'])))
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, vectors=self.vectors.astype(np.float16), song_ids=self.song_ids,
+                 songs=json.dumps(self.songs, ensure_ascii=False))
+
+    def find_song(self, artist, title):
+        for song_id, song in enumerate(self.songs):
+            if song['Artist'] == artist and song['Title'] == title:
+                return song_id
+        return None
+
+    def add(self, audio, artist, title):
+        """곡 오디오를 인덱스에 추가. 이미 있는 곡이면 창을 더해서 다른 녹음/구간도 찾을 수 있게 함."""
+        vectors = windows(audio, INDEX_HOP_FRAMES)
+        if len(vectors) == 0:
+            return None
+        song_id = self.find_song(artist, title)
+        if song_id is None:
+            song_id = len(self.songs)
+            self.songs.append({'Artist': artist, 'Title': title})
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self.song_ids = np.concatenate([self.song_ids, np.full(len(vectors), song_id, dtype=np.int32)])
+        self.tables = None
+        return song_id
+
+    def _candidates(self, vector):
+        if self.tables is None:
+            self._build_tables()
+        found = []
+        for table, (keys, order) in enumerate(self.tables):
+            key = self._signatures(vector[None, :], table)[0]
+            lo, hi = np.searchsorted(keys, key, 'left'), np.searchsorted(keys, key, 'right')
+            found.append(order[lo:hi])
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def identify(self, audio, min_similarity=0.85, min_votes=3, min_ratio=0.3):
+        """play 구간 오디오 -> {'Artist', 'Title', 'votes', 'windows'} 또는 None."""
+        if len(self.songs) == 0:
+            return None
+        queries = windows(audio, QUERY_HOP_FRAMES)
+        votes = Counter()
+        for vector in queries:
+            candidates = self._candidates(vector)
+            if len(candidates) == 0:
+                continue
+            similarity = self.vectors[candidates].astype(np.float32) @ vector
+            best = int(np.argmax(similarity))
+            if similarity[best] >= min_similarity:
+                votes[int(self.song_ids[candidates[best]])] += 1
+        if not votes:
+            return None
+        ranked = votes.most_common(2)
+        song_id, count = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        if count < min_votes or count < min_ratio * len(queries) or count < 2 * runner_up:
+            return None
+        return dict(self.songs[song_id], votes=count, windows=len(queries))
+
+
+def parse_song_label(transcript):
+    """make_piece.py의 play 행 Transcript '[Artist - Title]' -> (artist, title)"""
+    m = re.match(r'^\[(.+?) - (.+)\]$', (transcript or '').strip())
+    return (m.group(1), m.group(2)) if m else None
+
+
+def add_broadcast(index, processed_dir, pcm):
+    """이전 방송의 play 행 중 playlist로 곡이 확인된 구간을 인덱스에 추가."""
+    info_csv = os.path.join(processed_dir, 'transcripts', 'segments_info.csv')
+    added = 0
+    for row in Timeline.read_csv(info_csv, schema=SEGMENTS_INFO).records():
+        song = parse_song_label(row['Transcript']) if row.label == 'play' else None
+        if song is None:
+            continue
+        if index.add(pcm.read_float(row.start, row.stop), *song) is not None:
+            added += 1
+    print(f"Added {added} play segments from {processed_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the chroma fingerprint index of songs heard in earlier broadcasts.')
+    parser.add_argument('--index', required=True, help='Song index path (.npz).')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    broadcast_parser = sub.add_parser('add-broadcast', help='Add the labelled play rows of a processed broadcast.')
+    broadcast_parser.add_argument('--processed_dir', required=True, help='make_piece.py output dir (<processed>/<date>/<station>-<time>). Prefer time-labelled stations (kbs2fm, sbs).')
+    broadcast_parser.add_argument('--pcm_cache', required=True, help='PCM cache of the same broadcast (pcm_cache.py).')
+
+    song_parser = sub.add_parser('add', help='Add one song file.')
+    song_parser.add_argument('--audio', required=True, help='Audio file of the song.')
+    song_parser.add_argument('--artist', required=True)
+    song_parser.add_argument('--title', required=True)
+    args = parser.parse_args()
+
+    index = SongIndex.load(args.index)
+    if args.command == 'add-broadcast':
+        from pcm_cache import PcmCache
+        add_broadcast(index, args.processed_dir, PcmCache(args.pcm_cache))
+    else:
+        from asr_engine import load_audio
+        index.add(load_audio(args.audio), args.artist, args.title)
+    index.save(args.index)
+    print(f"{len(index.songs)} songs, {len(index.vectors)} windows in {args.index}")
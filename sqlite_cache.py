@@ -0,0 +1,71 @@
+import os
+import time
+import sqlite3
+
+
+class SqliteCache:
+    """SQLite에 저장하는 key-value 캐시.
+
+    max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 지우고(LRU), ttl(초)이 지난 항목은 miss로 처리함.
+    """
+
+    def __init__(self, path, max_bytes=None, ttl=None):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)')
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute('SELECT value, created FROM cache WHERE key = ?', (key,)).fetchone()
+        now = time.time()
+        if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+            if row is not None:
+                self.conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self.conn.commit()
+            self.misses += 1
+            return None
+        self.conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        self.conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+            (key, value, len(value.encode('utf-8')), now, now),
+        )
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        if self.ttl is not None:
+            self.conn.execute('DELETE FROM cache WHERE created < ?', (time.time() - self.ttl,))
+        if self.max_bytes is not None:
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self.conn.execute('SELECT key, size FROM cache ORDER BY accessed').fetchall():
+                    self.conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+        self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.1f}% hit rate)"
+
+    def close(self):
+        self.conn.close()
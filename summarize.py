@@ -1,29 +1,100 @@
-import csv
 import re
 import os
+import sys
+import json
+import time
+import random
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from google.genai.errors import APIError
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from collections import defaultdict
 
+from gemini_context import PromptContextCache, TokenUsage
+from timeline import SEGMENTS_INFO, Timeline, to_ms
+from transcript_filter import filter_transcript
+
 MAX_PROMPT_LENGTH = 3000
+MODEL = "gemini-2.5-flash"
+GENERATION_CONFIG = {
+    "max_output_tokens": 4096,
+    "temperature": 0.4,
+}
+API_RETRIES = 5
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 60.0
 
 load_dotenv()
 
 client = genai.Client(api_key=os.environ.get('GEMINI_API_SECOND'))
 
+
+class TokenBucket:
+    """분당 rate개 요청까지 허용하는 token bucket (burst개까지 몰아서 보낼 수 있음). 여러 스레드에서 공유."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# 모든 Gemini 호출이 공유하는 rate limiter (None이면 제한 없음). __main__에서 --rpm으로 설정
+rate_limiter = None
+# 요약 응답 캐시 (summary_cache.SummaryCache, None이면 사용 안 함). __main__에서 --summary_cache로 설정
+summary_cache = None
+# 고정 지시문 context cache (gemini_context.PromptContextCache, None이면 지시문을 매 요청에 포함). --context_cache로 설정
+prompt_context = None
+# 실행 동안의 Gemini 토큰 사용량
+token_usage = TokenUsage()
+
+
+def is_retryable(error):
+    """429(rate limit)와 5xx만 재시도. 400/403/404 같은 요청 오류는 다시 보내도 실패함."""
+    code = getattr(error, 'code', None) or 0
+    return code == 429 or code >= 500
+
+
+def generate_with_retry(**kwargs):
+    """client.models.generate_content를 rate limit에 맞춰 호출하고, 429/5xx면 jitter를 준 지수 backoff로 재시도."""
+    for attempt in range(API_RETRIES + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return client.models.generate_content(**kwargs)
+        except APIError as e:
+            if attempt == API_RETRIES or not is_retryable(e):
+                raise
+            delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.5)
+            print(f"Gemini API 오류: {e} - {delay:.1f}초 후 재시도 ({attempt + 1}/{API_RETRIES})")
+            time.sleep(delay)
+
 def clean_transcript(transcript):
     """Remove text in square brackets and trim whitespace."""
     return re.sub(r'\[.*?\]', '', transcript).strip()
 
-def summary_request(transcript):
-    """Send a request to the OpenAI API to summarize the transcript."""
-    clean_text = clean_transcript(transcript)
+# 프롬프트 문구를 바꾸면 버전도 올려서 요약 캐시가 예전 응답을 쓰지 않게 함
+PROMPT_VERSION = 1
+CHUNK_PROMPT_VERSION = 'chunk-1'
+REDUCE_PROMPT_VERSION = 'reduce-1'
 
-    prompt = f"""
-    다음은 라디오 프로그램을 받아적은 텍스트야. 텍스트를 아래 조건에 맞게 요약해줘.
+SUMMARY_RULES = """
     1. 제목, 주요 내용, 청취자 사연, 광고 정보를 순서대로 포함하여 요약해야 해.
     2. 제목은 주요 내용과 청취자 사연, 음악을 바탕으로 흥미와 관심을 이끌 수 있어야 하고, 광고 내용이 들어가서는 안돼.
     3. 청취자 사연과 광고 정보는 있을 수도 있고 없을 수도 있어. 없다면 없다고 표시해.
@@ -40,15 +111,57 @@ def summary_request(transcript):
     텍스트:
     {clean_text}
     """
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt,
-        config={
-            "max_output_tokens": 4096,
-            "temperature": 0.4,
-        }
-    )
+
+SUMMARY_PROMPT = """
+    다음은 라디오 프로그램을 받아적은 텍스트야. 텍스트를 아래 조건에 맞게 요약해줘.""" + SUMMARY_RULES
+
+# 계층 요약(--hierarchical): 긴 구간을 행 단위 chunk로 나눠 CHUNK_PROMPT로 정리(map)한 뒤 REDUCE_PROMPT로 합침(reduce)
+CHUNK_PROMPT = """
+    다음은 라디오 프로그램의 긴 구간 중 일부를 받아적은 텍스트야. 나중에 다른 부분과 합쳐서 요약할 수 있도록 아래 조건에 맞게 정리해줘.
+    1. 주요 내용, 청취자 사연(전화번호 또는 도시, 청취자 이름 등 포함), 광고 정보(제품, 회사, 특징)를 빠짐없이 짧은 문장으로 정리해.
+    2. 유튜브에서 나오는 텍스트는 절대 처리하지 않아. 예를 들어 구독과 좋아요 같은 것은 오류야.
+    3. 제목과 태그는 쓰지 마.
+
+    텍스트:
+    {clean_text}
+    """
+
+REDUCE_PROMPT = """
+    다음은 라디오 프로그램의 한 구간을 앞에서부터 순서대로 나눠서 정리한 부분 요약들이야. 부분 요약들을 하나로 합쳐서 아래 조건에 맞게 요약해줘.""" + SUMMARY_RULES
+
+
+def summary_request(transcript):
+    """Send a request to the OpenAI API to summarize the transcript."""
+    return request_summary(clean_transcript(transcript), SUMMARY_PROMPT, PROMPT_VERSION)
+
+
+def request_summary(clean_text, template, prompt_version):
+    """정리된 텍스트를 template 프롬프트로 요약. 실패하면 "" 또는 "요약 오류"."""
+    if prompt_context is not None:
+        # 지시문을 분리해서 보내면 요청 내용이 달라지므로 캐시 key도 구분
+        prompt_version = f"{prompt_version}+context"
+    cache_key = None
+    if summary_cache is not None:
+        cache_key = summary_cache.key(MODEL, GENERATION_CONFIG, prompt_version, clean_text)
+        cached = summary_cache.get(cache_key)
+        if cached is not None:
+            token_usage.add_local_hit()
+            return cached
+
+    if prompt_context is not None:
+        contents, config = prompt_context.request(template, clean_text, GENERATION_CONFIG)
+    else:
+        contents, config = template.format(clean_text=clean_text), GENERATION_CONFIG
     try:
+        response = generate_with_retry(
+            model=MODEL,
+            contents=contents,
+            config=config,
+        )
+        if prompt_context is not None:
+            token_usage.add(response, *prompt_context.instruction_tokens(template))
+        else:
+            token_usage.add(response)
         if response.text is None:
             block_reason = None
             if response.candidates and response.candidates[0].finish_reason:
@@ -57,7 +170,11 @@ def summary_request(transcript):
                 print(f"경고: Gemini 응답 텍스트가 None입니다. 차단 사유: {block_reason}. Prompt length: {len(clean_text)}.")
                 return "요약 오류"
         
-        return response.text.strip()
+        summary = response.text.strip()
+        # 차단/오류 응답("요약 오류", "")은 캐시하지 않음
+        if cache_key is not None and summary:
+            summary_cache.put(cache_key, summary)
+        return summary
     except APIError as e:
         print(f"Gemini API 오류: {e}")
         return ""
@@ -65,122 +182,520 @@ def summary_request(transcript):
         print(f"예기치 않은 오류 발생: {e}")
         return ""
 
-# def recursive_summary(text):
-#     """
-#     텍스트가 MAX_PROMPT_LENGTH보다 길면 분할하여 요약하고, 
-#     최종적으로 하나의 요약본을 반환합니다.
-#     """
-#     # 텍스트가 이미 충분히 짧다면 바로 요약 요청
-#     if len(text) <= MAX_PROMPT_LENGTH:
-#         return summary_request(text)
-
-#     # 텍스트를 MAX_PROMPT_LENGTH 크기의 청크(chunk)로 나눔
-#     chunk_size = MAX_PROMPT_LENGTH 
-    
-#     # 한국어 토큰이 문자당 2~3토큰인 점을 고려하여, 안전하게 문자 수를 토큰 제한보다 작게 설정
-#     # (예: MAX_PROMPT_LENGTH를 3000 정도로 설정하여 LLM API의 토큰 제한에 맞추는 것이 좋습니다.)
-    
-#     chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
-    
-#     # 1단계 요약: 각 청크를 요약
-#     summaries = []
-#     for i, chunk in enumerate(chunks):
-#         # 각 청크를 요약할 때는 '다음 내용을 요약하시오'와 같은 프롬프트를 추가할 수 있습니다.
-#         summaries.append(summary_request(chunk))
-        
-#     # 2단계 요약: 요약본들을 다시 합쳐서 최종 요약 요청 (재귀 호출)
-#     combined_summaries = " ".join(summaries)
+def estimate_tokens(text):
+    """토큰 수 어림값. Gemini 토크나이저에서 한국어는 대략 문자당 1토큰 이하라서 문자 수를 그대로 사용."""
+    return len(text)
+
+
+class SectionPlanner:
+    """segments_info 행을 하나씩 받아서 요약 구간으로 나눔 (play 행 또는 전사가 max_length를 넘으면 끊음).
+
+    feed()는 그 행에서 닫힌 구간 목록을, finish()는 남은 구간을 돌려줌. 구간은
+    {'id', 'start', 'end', 'duration_ms', 'transcript', 'texts', 'music_info', 'remainder', 'raw_chars', 'removed_chars', 'speech_ms'}.
+    texts는 구간에 들어간 행별 정리된 전사 (계층 요약에서 행 경계로 chunk를 나눌 때 사용).
+    text_filter(예: transcript_filter.filter_transcript)를 주면 combined_transcript에 넣기 전에 행마다 적용하고,
+    바로 앞 행과 똑같은 전사도 뺌. 지운 문자 수는 removed_chars.
+    """
+
+    def __init__(self, max_length=MAX_PROMPT_LENGTH, text_filter=None):
+        self.max_length = max_length
+        self.text_filter = text_filter
+        self.next_id = 1
+        self.reset()
+
+    def reset(self):
+        self.combined_transcript = ""
+        self.texts = []
+        self.previous_text = None
+        self.raw_chars = 0
+        self.removed_chars = 0
+        self.speech_ms = 0
+        self.section_start = None
+        self.section_end = None
+        self.section_duration_ms = 0
+
+    def close_section(self, music_info, remainder=False):
+        section = {
+            'id': self.next_id,
+            'start': self.section_start,
+            'end': self.section_end,
+            'duration_ms': self.section_duration_ms,
+            'transcript': self.combined_transcript.strip(),
+            'texts': self.texts,
+            'music_info': music_info,
+            'remainder': remainder,
+            'raw_chars': self.raw_chars,
+            'removed_chars': self.removed_chars,
+            'speech_ms': self.speech_ms,
+        }
+        self.next_id += 1
+        self.reset()
+        return section
+
+    def feed(self, label, start, stop, duration_ms, transcript):
+        row_type = label.lower()
+        clean_text = clean_transcript(transcript)
+        closed = []
+
+        if self.section_start is None:
+            self.section_start = start
+        self.section_end = stop
+        self.section_duration_ms += duration_ms
+        if row_type == 'speech':
+            self.speech_ms += duration_ms
+
+        if row_type == 'play':
+            closed.append(self.close_section(transcript.strip()))
+
+        elif row_type in ['speech', 'music']:
+            # 지문 DB로 태그된 ad/jingle 등의 행은 요약 프롬프트에 넣지 않음
+            self.raw_chars += len(clean_text)
+            if self.text_filter is not None:
+                filtered = self.text_filter(clean_text)
+                if filtered and filtered == self.previous_text:
+                    filtered = ""
+                else:
+                    self.previous_text = filtered or self.previous_text
+                self.removed_chars += len(clean_text) - len(filtered)
+                clean_text = filtered
+            self.combined_transcript += clean_text + " "
+            if clean_text:
+                self.texts.append(clean_text)
+
+        if len(self.combined_transcript) > self.max_length:
+            closed.append(self.close_section("[없음]"))
+        return closed
+
+    def finish(self):
+        if self.combined_transcript.strip():
+            return [self.close_section("[없음]", remainder=True)]
+        return []
+
+
+def plan_sections(timeline, max_length=MAX_PROMPT_LENGTH, text_filter=None):
+    """segments_info 타임라인 전체를 요약 구간 목록으로 나눔 (SectionPlanner 참고)."""
+    planner = SectionPlanner(max_length, text_filter)
+    sections = []
+    for row in timeline.records():
+        sections += planner.feed(row.label, row.start, row.stop, row.duration_ms, row['Transcript'])
+    return sections + planner.finish()
+
+
+def merge_sections(first, second):
+    """이어진 두 구간을 하나로. 음악 정보는 둘 다 있으면 이어 붙임."""
+    infos = [info for info in (first['music_info'], second['music_info']) if info != "[없음]"]
+    return {
+        'id': first['id'],
+        'start': first['start'],
+        'end': second['end'],
+        'duration_ms': first['duration_ms'] + second['duration_ms'],
+        'transcript': (first['transcript'] + " " + second['transcript']).strip(),
+        'texts': first['texts'] + second['texts'],
+        'music_info': " ".join(infos) if infos else "[없음]",
+        'remainder': second['remainder'],
+        'raw_chars': first['raw_chars'] + second['raw_chars'],
+        'removed_chars': first['removed_chars'] + second['removed_chars'],
+        'speech_ms': first['speech_ms'] + second['speech_ms'],
+    }
+
+
+class SectionCoalescer:
+    """말이 거의 없는 작은 구간(speech가 min_speech_ms 미만이거나 전사가 min_chars 미만)을 이웃 구간에 합침.
 
-#     # 재귀적으로 다시 호출하여 최종적으로 하나의 짧은 요약본을 만듭니다.
-#     return recursive_summary(combined_summaries)
+    작은 구간은 앞 구간에 붙이고, 합친 전사가 max_length를 넘으면 다음 구간에 붙이고, 그것도 넘으면 그대로 둠.
+    합쳐서 max_length를 넘는 구간은 만들지 않음.
+    push()는 더 이상 바뀌지 않는 구간을 돌려주고(한 구간 늦게), ID는 내보낼 때 1부터 다시 매김.
+    구간은 시간순으로 이어져 있으므로 merge_mp3.py/create_image.py가 읽는 'ID: n [start - stop]'도 그대로 유효함.
+    """
+
+    def __init__(self, min_speech_ms=0, min_chars=0, max_length=MAX_PROMPT_LENGTH):
+        self.min_speech_ms = min_speech_ms
+        self.min_chars = min_chars
+        self.max_length = max_length
+        self.last = None
+        self.carry = None
+        self.next_id = 1
+
+    def is_small(self, section):
+        return section['speech_ms'] < self.min_speech_ms or len(section['transcript']) < self.min_chars
+
+    def fits(self, first, second):
+        return len(first['transcript']) + 1 + len(second['transcript']) <= self.max_length
+
+    def emit(self, section):
+        section['id'] = self.next_id
+        self.next_id += 1
+        return [section]
+
+    def push(self, section):
+        ready = []
+        # carry가 있으면 last는 이미 내보낸 상태(None)
+        if self.carry is not None:
+            if self.fits(self.carry, section):
+                section = merge_sections(self.carry, section)
+            else:
+                ready += self.emit(self.carry)
+            self.carry = None
+        if self.is_small(section):
+            if self.last is not None and self.fits(self.last, section):
+                self.last = merge_sections(self.last, section)
+                return ready
+            if self.last is not None:
+                ready += self.emit(self.last)
+            self.last = None
+            self.carry = section
+            return ready
+        if self.last is not None:
+            ready += self.emit(self.last)
+        self.last = section
+        return ready
+
+    def finish(self):
+        ready = []
+        if self.carry is not None:
+            if self.last is not None and self.fits(self.last, self.carry):
+                self.last = merge_sections(self.last, self.carry)
+            else:
+                if self.last is not None:
+                    ready += self.emit(self.last)
+                self.last = self.carry
+            self.carry = None
+        if self.last is not None:
+            ready += self.emit(self.last)
+            self.last = None
+        return ready
+
+
+def coalesce_sections(sections, min_speech_ms=0, min_chars=0, max_length=MAX_PROMPT_LENGTH):
+    coalescer = SectionCoalescer(min_speech_ms, min_chars, max_length)
+    merged = []
+    for section in sections:
+        merged += coalescer.push(section)
+    return merged + coalescer.finish()
+
+
+def count_calls(sections, chunk_tokens=None):
+    """구간 목록의 Gemini 요청 수 (계층 요약이면 긴 구간의 chunk 정리 + 합치기 요청까지 셈, 추가 map 단계는 제외)."""
+    calls = 0
+    for section in sections:
+        if chunk_tokens is None or estimate_tokens(section['transcript']) <= chunk_tokens:
+            calls += 1
+        else:
+            calls += len(split_chunks(section['texts'], chunk_tokens)) + 1
+    return calls
+
+
+def run_parallel(fn, items, concurrency=1):
+    """fn(item)을 최대 concurrency개까지 동시에 실행. 결과는 items 순서대로."""
+    if concurrency <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(fn, items))
+
+
+def summarize_sections(sections, concurrency=1):
+    """구간 요약을 최대 concurrency개까지 동시에 요청. 결과는 sections 순서대로."""
+    return run_parallel(lambda section: summary_request(section['transcript']), sections, concurrency)
+
+
+def split_chunks(texts, budget):
+    """행 단위 텍스트를 순서대로 묶어서 chunk마다 estimate_tokens가 budget 이하가 되게 나눔.
+
+    행 하나가 budget을 넘으면 그 행만 공백 경계에서 나눔.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        pieces = [text]
+        if estimate_tokens(text) > budget:
+            pieces, words = [], []
+            for word in text.split():
+                if words and estimate_tokens(" ".join(words + [word])) > budget:
+                    pieces.append(" ".join(words))
+                    words = []
+                words.append(word)
+            if words:
+                pieces.append(" ".join(words))
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + 1 + tokens > budget:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current_tokens += tokens + (1 if current else 0)
+            current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def is_failed(summary):
+    return not summary or summary == "요약 오류"
+
+
+def hierarchical_summaries(sections, chunk_tokens, concurrency=1):
+    """구간별 계층 요약 (map-reduce). 결과는 sections 순서대로.
+
+    chunk_tokens 안에 들어가는 구간은 기존처럼 한 번에 요약하고, 긴 구간은 행 경계로 chunk를 나눠
+    모든 구간의 chunk를 한꺼번에 병렬로 정리한 뒤, 구간마다 부분 요약을 REDUCE_PROMPT로 합침.
+    부분 요약을 합친 길이도 chunk_tokens를 넘으면 같은 방식으로 한 단계 더 정리함.
+    """
+    summaries = [None] * len(sections)
+    final_requests = {}
+    pending = {}
+    for i, section in enumerate(sections):
+        if estimate_tokens(section['transcript']) <= chunk_tokens:
+            final_requests[i] = (section['transcript'], SUMMARY_PROMPT, PROMPT_VERSION)
+        else:
+            pending[i] = split_chunks(section['texts'], chunk_tokens)
 
-def process_single_file(csv_path, out_path):
+    level = 0
+    while pending:
+        level += 1
+        calls = [(i, chunk) for i, chunks in pending.items() for chunk in chunks]
+        print(f"Map level {level}: {len(calls)} chunks from {len(pending)} sections")
+        results = run_parallel(lambda call: request_summary(call[1], CHUNK_PROMPT, CHUNK_PROMPT_VERSION), calls, concurrency)
+        notes = {i: [] for i in pending}
+        for (i, _), result in zip(calls, results):
+            if is_failed(result):
+                # 정리에 실패한 chunk는 건너뛰고, 모두 실패하면 그 결과를 구간 요약으로 사용
+                summaries[i] = result
+            else:
+                notes[i].append(result)
+
+        next_pending = {}
+        for i, parts in notes.items():
+            if not parts:
+                continue
+            summaries[i] = None
+            joined = "\n".join(parts)
+            regrouped = split_chunks(parts, chunk_tokens)
+            if estimate_tokens(joined) <= chunk_tokens or len(regrouped) >= len(pending[i]):
+                final_requests[i] = (joined, REDUCE_PROMPT, REDUCE_PROMPT_VERSION)
+            else:
+                next_pending[i] = regrouped
+        pending = next_pending
+
+    order = sorted(final_requests)
+    results = run_parallel(lambda i: request_summary(*final_requests[i]), order, concurrency)
+    for i, result in zip(order, results):
+        summaries[i] = result
+    return summaries
+
+
+def write_section(outfile, section, summary):
+    minutes, seconds = divmod(section['duration_ms'] // 1000, 60)
+    kind = "남은 구간" if section['remainder'] else "구간"
+    outfile.write(f"ID: {section['id']}  [{section['start']:.2f} - {section['end']:.2f}] 약 {minutes}분 {seconds}초 {kind} 요약\n")
+    outfile.write(summary + "\n")
+    outfile.write(f"음악 정보: {section['music_info']}\n")
+    if not section['remainder']:
+        outfile.write("-" * 40 + "\n")
+
+
+def log_filtered(sections):
+    """구간별로 로컬 필터가 지운 문자 수."""
+    total_raw = sum(section['raw_chars'] for section in sections)
+    total_removed = sum(section['removed_chars'] for section in sections)
+    for section in sections:
+        if section['removed_chars']:
+            ratio = section['removed_chars'] / section['raw_chars'] * 100
+            print(f"  ID {section['id']}: removed {section['removed_chars']}/{section['raw_chars']} chars ({ratio:.1f}%)")
+    ratio = total_removed / total_raw * 100 if total_raw else 0.0
+    print(f"Transcript filter: removed {total_removed}/{total_raw} chars ({ratio:.1f}%)")
+
+
+def process_single_file(csv_path, out_path, concurrency=1, hierarchical=False, chunk_tokens=MAX_PROMPT_LENGTH, max_section_tokens=None, text_filter=None, min_speech_seconds=0, min_chars=0):
     print(f"Processing: {csv_path}")
 
     if not os.path.exists(csv_path):
         print(f"Input file {csv_path} does not exist.")
         return
 
-    with open(csv_path, 'r', encoding='utf-8-sig') as csvfile, \
-         open(out_path, 'w', encoding='utf-8') as outfile:
+    timeline = Timeline.read_csv(csv_path, schema=SEGMENTS_INFO)
+    # 구간을 먼저 모두 나눈 뒤 요약 요청은 동시에 보내고, summary.txt는 section_id 순서대로 씀
+    if hierarchical:
+        # 구간은 play 행(또는 max_section_tokens)에서만 끊고, 긴 구간은 chunk로 나눠 map-reduce로 요약
+        max_length = max_section_tokens or float('inf')
+    else:
+        max_length = MAX_PROMPT_LENGTH
+    sections = plan_sections(timeline, max_length, text_filter)
+    if min_speech_seconds or min_chars:
+        planned = sections
+        # 계층 요약에서는 합친 구간이 chunk 하나에 들어가야 요청 수가 줄어듦
+        chunk_budget = chunk_tokens if hierarchical else None
+        sections = coalesce_sections(planned, int(min_speech_seconds * 1000), min_chars, min(max_length, chunk_budget or max_length))
+        print(f"Sections: {len(planned)} -> {len(sections)} "
+              f"(LLM calls {count_calls(planned, chunk_budget)} -> {count_calls(sections, chunk_budget)})")
+    if text_filter is not None:
+        log_filtered(sections)
+    if hierarchical:
+        summaries = hierarchical_summaries(sections, chunk_tokens, concurrency)
+    else:
+        summaries = summarize_sections(sections, concurrency)
 
-        reader = csv.DictReader(csvfile)
+    with open(out_path, 'w', encoding='utf-8') as outfile:
+        for section, summary in zip(sections, summaries):
+            write_section(outfile, section, summary)
 
-        combined_transcript = ""
-        section_id = 1
-        section_start = None
-        section_end = None
-        section_duration = 0
+    print(f"Summary saved to {out_path}")
+    print(f"Token usage: {token_usage.report()}")
 
-        for row in reader:
-            row_type = row['Type'].lower()
-            try:
-                duration = float(row['Duration'])
-                start = float(row['Start Time'])
-                stop = float(row['Stop Time'])
-            except Exception as e:
-                print(f"Error parsing numeric values in row: {e}")
-                continue
 
-            transcript = row['Transcript']
-            clean_text = clean_transcript(transcript)
-
-            if section_start is None:
-                section_start = start
-            section_end = stop
-            section_duration += duration
-
-            if row_type == 'play':
-                music_info = transcript.strip()
-                # summary = recursive_summary(combined_transcript.strip())
-                summary = summary_request(combined_transcript.strip())
-                minutes = int(section_duration // 60)
-                seconds = int(section_duration % 60)
-                outfile.write(f"ID: {section_id}  [{section_start:.2f} - {section_end:.2f}] 약 {minutes}분 {seconds}초 구간 요약\n")
-                outfile.write(summary + "\n")
-                outfile.write(f"음악 정보: {music_info}\n")
-                outfile.write("-" * 40 + "\n")
-
-                section_id += 1
-                section_start = None
-                section_end = None
-                section_duration = 0
-                combined_transcript = ""
-                
-            elif row_type in ['speech', 'music']:
-                combined_transcript += clean_text + " "
-
-            if len(combined_transcript) > MAX_PROMPT_LENGTH:
-                    # summary = recursive_summary(combined_transcript.strip())
-                    summary = summary_request(combined_transcript.strip())
-                    minutes = int(section_duration // 60)
-                    seconds = int(section_duration % 60)
-                    outfile.write(f"ID: {section_id}  [{section_start:.2f} - {section_end:.2f}] 약 {minutes}분 {seconds}초 구간 요약\n")
-                    outfile.write(summary + "\n")
-                    outfile.write(f"음악 정보: [없음]\n")
-                    outfile.write("-" * 40 + "\n")
-
-                    section_id += 1
-                    section_start = None
-                    section_end = None
-                    section_duration = 0
-                    combined_transcript = ""
-
-        if combined_transcript.strip():
-            # summary = recursive_summary(combined_transcript.strip())
-            summary = summary_request(combined_transcript.strip())
-            minutes = int(section_duration // 60)
-            seconds = int(section_duration % 60)
-            outfile.write(f"ID: {section_id}  [{section_start:.2f} - {section_end:.2f}] 약 {minutes}분 {seconds}초 남은 구간 요약\n")
-            outfile.write(summary + "\n")
-            outfile.write("음악 정보: [없음]\n")
+def follow_journal(journal_path, poll_seconds=2.0, idle_timeout=None):
+    """make_piece.py가 쓰는 체크포인트 journal(segments_info.csv.journal)을 tail하면서 행을 Id 순서대로 내보냄.
 
+    행은 전사가 끝나는 순서로 기록되므로(지문 매칭 행은 먼저, play 행은 시작할 때 한꺼번에) Id 순서가 이어지는
+    만큼만 내보냄. make_piece.py가 마지막에 쓰는 {"done": true, "rows": N} 줄을 보고 N번째 행까지 내보내면 끝남.
+    완료 표시 없이 make_piece.py가 끝난 경우를 위해, journal이 idle_timeout초 동안 늘지 않으면 TimeoutError.
+    """
+    offset = 0
+    tail = b""
+    buffered = {}
+    next_id = 1
+    total = None
+    last_change = time.monotonic()
+    while True:
+        if os.path.exists(journal_path):
+            if os.path.getsize(journal_path) < offset:
+                # make_piece.py가 새로 시작하며 journal을 비움. 이미 내보낸 Id는 다시 내보내지 않음
+                print(f"{journal_path} was truncated; reading from the start")
+                offset, tail, total = 0, b"", None
+                last_change = time.monotonic()
+            with open(journal_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            offset += len(data)
+            if data:
+                last_change = time.monotonic()
+            lines = (tail + data).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if row.get('done'):
+                    total = row['rows']
+                elif 'Id' in row:
+                    # 완료 표시 뒤에 행이 또 오면 이전 실행의 표시이므로 무시 (make_piece.py --resume)
+                    total = None
+                    if int(row['Id']) >= next_id:
+                        buffered[int(row['Id'])] = row
+            while next_id in buffered:
+                yield buffered.pop(next_id)
+                next_id += 1
+            if total is not None and next_id > total:
+                return
+        if idle_timeout and time.monotonic() - last_change > idle_timeout:
+            raise TimeoutError(f"{journal_path}: {idle_timeout:.0f}초 동안 새 행이 없음 (make_piece.py가 완료 표시 없이 끝났을 수 있음)")
+        time.sleep(poll_seconds)
+
+
+def process_follow(journal_path, out_path, concurrency=1, hierarchical=False, chunk_tokens=MAX_PROMPT_LENGTH, max_section_tokens=None, text_filter=None, poll_seconds=2.0, min_speech_seconds=0, min_chars=0, idle_timeout=None):
+    """make_piece.py 실행 중에 journal을 따라가며 구간이 닫히는 즉시 요약 요청을 보냄.
+
+    summary.txt는 앞 구간의 요약이 끝나는 대로 section_id 순서로 이어 씀 (결과는 process_single_file과 같음).
+    """
+    print(f"Following: {journal_path}")
+    if hierarchical:
+        max_length = max_section_tokens or float('inf')
+        summarize = lambda section: hierarchical_summaries([section], chunk_tokens, 1)[0]
+    else:
+        max_length = MAX_PROMPT_LENGTH
+        summarize = lambda section: summary_request(section['transcript'])
+    planner = SectionPlanner(max_length, text_filter)
+    # 작은 구간은 다음 구간이 닫힐 때까지 기다렸다가 합쳐서 보냄
+    chunk_budget = chunk_tokens if hierarchical else None
+    coalescer = SectionCoalescer(int(min_speech_seconds * 1000), min_chars, min(max_length, chunk_budget or max_length))
+
+    planned = []
+    sections = []
+    pending = []
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool, open(out_path, 'w', encoding='utf-8') as outfile:
+        def write_ready(wait=False):
+            while pending and (wait or pending[0][1].done()):
+                section, future = pending.pop(0)
+                write_section(outfile, section, future.result())
+                outfile.flush()
+
+        def submit(closed):
+            planned.extend(closed)
+            for section in [ready for section in closed for ready in coalescer.push(section)]:
+                print(f"Section {section['id']} closed [{section['start']:.2f} - {section['end']:.2f}]")
+                sections.append(section)
+                pending.append((section, pool.submit(summarize, section)))
+
+        for row in follow_journal(journal_path, poll_seconds, idle_timeout):
+            start, stop = float(row['Start Time']), float(row['Stop Time'])
+            duration_ms = int(to_ms(stop)) - int(to_ms(start))
+            submit(planner.feed(row['Type'], start, stop, duration_ms, row['Transcript']))
+            write_ready()
+        submit(planner.finish())
+        for section in coalescer.finish():
+            sections.append(section)
+            pending.append((section, pool.submit(summarize, section)))
+        write_ready(wait=True)
+
+    if min_speech_seconds or min_chars:
+        print(f"Sections: {len(planned)} -> {len(sections)} "
+              f"(LLM calls {count_calls(planned, chunk_budget)} -> {count_calls(sections, chunk_budget)})")
+
+    if text_filter is not None:
+        log_filtered(sections)
     print(f"Summary saved to {out_path}")
+    print(f"Token usage: {token_usage.report()}")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Summarize radio transcript segments using OpenAI.')
     parser.add_argument('--csv_file', type=str, required=True, help='Path to segments_info.csv file')
     parser.add_argument('--output_file', type=str, required=True, help='Path to save summary.txt')
+    parser.add_argument('--follow', action='store_true', help='make_piece.py 실행 중에 <csv_file>.journal을 따라가며 구간이 닫히는 즉시 요약.')
+    parser.add_argument('--poll_seconds', type=float, default=2.0, help='--follow에서 journal을 다시 확인하는 간격(초).')
+    parser.add_argument('--idle_timeout', type=float, default=1800, help='--follow에서 journal이 이 시간(초) 동안 늘지 않으면 실패로 종료. 0이면 계속 기다림.')
+    parser.add_argument('--concurrency', type=int, default=4, help='동시에 보낼 Gemini 요약 요청 수.')
+    parser.add_argument('--rpm', type=float, default=60, help='분당 최대 Gemini 요청 수 (token bucket). 0이면 제한 없음.')
+    parser.add_argument('--hierarchical', action='store_true', help='MAX_PROMPT_LENGTH에서 구간을 자르지 않고, 긴 구간은 행 경계로 chunk를 나눠 병렬 요약 후 하나로 합침.')
+    parser.add_argument('--chunk_tokens', type=int, default=MAX_PROMPT_LENGTH, help='계층 요약의 chunk당 토큰 예산 (문자 수로 어림).')
+    parser.add_argument('--max_section_tokens', type=int, default=30000, help='계층 요약에서 play 행 없이 이어지는 구간을 자를 토큰 수. 0이면 play 행에서만 자름.')
+    parser.add_argument('--min_section_seconds', type=float, default=0, help='speech가 이보다 짧은 구간은 이웃 구간과 합쳐서 한 번에 요약 (예: 30, 기본 0은 끔). 합치면 ID가 다시 매겨짐.')
+    parser.add_argument('--min_section_chars', type=int, default=0, help='전사가 이 문자 수보다 짧은 구간은 이웃 구간과 합쳐서 한 번에 요약 (예: 200, 기본 0은 끔).')
+    parser.add_argument('--transcript_filter', action='store_true', help='요약 전에 상투 문구/추임새/반복을 지우는 로컬 필터(transcript_filter.py)를 켬. 실제 전사에서 검증 전이라 기본은 꺼짐.')
+    parser.add_argument('--context_cache', action='store_true', help='고정 요약 지시문을 요청 본문에서 떼어 system_instruction으로 보냄 (implicit caching). 지시문이 모델의 최소 캐시 크기 이상이면 Gemini context cache로 한 번만 올림.')
+    parser.add_argument('--context_cache_ttl', type=int, default=3600, help='context cache 유지 시간(초). 실행이 끝나면 삭제함.')
+    parser.add_argument('--token_report', type=str, default=None, help='방송별 토큰 사용량을 JSON 한 줄씩 추가할 파일 경로.')
+    parser.add_argument('--summary_cache', type=str, default=None, help='요약 응답 캐시 SQLite 경로. 모델/설정/프롬프트/전사가 같은 구간은 Gemini를 다시 호출하지 않음.')
+    parser.add_argument('--summary_cache_mb', type=int, default=256, help='요약 캐시 최대 크기(MB). 넘으면 오래 안 쓴 항목부터 삭제.')
+    parser.add_argument('--summary_cache_days', type=float, default=30, help='요약 캐시 항목 유효 기간(일).')
     args = parser.parse_args()
-    process_single_file(args.csv_file, args.output_file)
+    if args.rpm > 0:
+        rate_limiter = TokenBucket(args.rpm, burst=args.concurrency)
+    if args.summary_cache:
+        from summary_cache import SummaryCache
+        summary_cache = SummaryCache(args.summary_cache, max_bytes=args.summary_cache_mb * 1024 * 1024,
+                                     ttl=args.summary_cache_days * 86400)
+    if args.context_cache:
+        prompt_context = PromptContextCache(client, MODEL, args.context_cache_ttl)
+    try:
+        text_filter = filter_transcript if args.transcript_filter else None
+        if args.follow:
+            try:
+                process_follow(args.csv_file + '.journal', args.output_file, args.concurrency,
+                               args.hierarchical, args.chunk_tokens, args.max_section_tokens, text_filter, args.poll_seconds,
+                               args.min_section_seconds, args.min_section_chars, args.idle_timeout)
+            except TimeoutError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+        else:
+            process_single_file(args.csv_file, args.output_file, args.concurrency,
+                                args.hierarchical, args.chunk_tokens, args.max_section_tokens, text_filter,
+                                args.min_section_seconds, args.min_section_chars)
+    finally:
+        if prompt_context is not None:
+            prompt_context.close()
+    if args.token_report:
+        token_usage.append_report(args.token_report, args.csv_file)
+    if summary_cache is not None:
+        print(f"Summary cache: {summary_cache.stats()}")
+        summary_cache.close()
@@ -0,0 +1,33 @@
+import json
+import hashlib
+import threading
+
+from sqlite_cache import SqliteCache
+
+
+class SummaryCache(SqliteCache):
+    """모델 이름 + 생성 설정 + 프롬프트 버전 + 정리된 전사의 해시를 key로 하는 Gemini 요약 응답 캐시.
+
+    전사가 바뀌지 않은 방송을 다시 요약할 때 API 호출을 건너뜀.
+    summarize.py는 여러 스레드에서 동시에 요청하므로 get/put을 lock으로 감쌈.
+    """
+
+    def __init__(self, path, max_bytes=None, ttl=None):
+        super().__init__(path, max_bytes=max_bytes, ttl=ttl)
+        self.lock = threading.Lock()
+
+    def key(self, model, config, prompt_version, text):
+        settings = json.dumps({'model': model, 'config': config, 'prompt_version': prompt_version},
+                              sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(settings.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            return super().get(key)
+
+    def put(self, key, value):
+        with self.lock:
+            super().put(key, value)
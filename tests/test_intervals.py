@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import intervals
+from benchmark_intervals import (legacy_merge_no_energy_first, legacy_merge_play_segments, legacy_merge_rows,
+                                 legacy_play_segments, synthetic_segmentation, to_csv)
+from timeline import Timeline
+
+# 예전 행 단위 구현(benchmark_intervals.py의 legacy_*)과 CSV 출력이 byte 단위로 같은지 확인
+
+
+def read_both(df, tmp_path):
+    """ina TSV로 한 번 써서 예전처럼 pd.read_csv로, 새 코드는 Timeline.read_csv로 읽음."""
+    path = tmp_path / 'segments.csv'
+    df.to_csv(path, sep='\t', index=False)
+    return pd.read_csv(path, sep='\t'), Timeline.read_csv(path, sep='\t')
+
+
+@pytest.mark.parametrize('frames', [True, False])
+def test_remove_noenergy_matches_legacy(tmp_path, frames):
+    df, tl = read_both(synthetic_segmentation(3000, hours=2, seed=1, frames=frames), tmp_path)
+    fast = intervals.merge_rows(intervals.merge_no_energy_first(tl))
+    assert to_csv(fast) == to_csv(legacy_merge_rows(legacy_merge_no_energy_first(df)))
+
+
+@pytest.mark.parametrize('frames', [True, False])
+def test_play_segments_matches_legacy(tmp_path, frames):
+    df, tl = read_both(synthetic_segmentation(3000, hours=6, seed=2, frames=frames), tmp_path)
+    assert to_csv(intervals.play_segments(tl)) == to_csv(legacy_play_segments(df))
+
+
+def test_merge_rows_absorbs_zero_length_rows():
+    tl = Timeline.from_labels(['speech', 'music', 'speech', 'music'], [0.0, 1.0, 1.0, 3.0], [1.0, 1.0, 2.0, 4.0])
+    merged = intervals.merge_rows(tl)
+    # 길이 0인 music은 다음 music까지 늘어나고 그 사이 speech는 버려짐
+    assert merged.labels.tolist() == ['speech', 'music']
+    assert merged.stop.tolist() == [1.0, 4.0]
+
+
+def test_merge_play_segments_matches_legacy():
+    labels = ['play', 'play', 'speech', 'play', 'play', 'music', 'play']
+    starts = [0.0, 100.0, 300.0, 400.0, 700.0, 1000.0, 1100.0]
+    stops = [90.0, 200.0, 400.0, 460.0, 800.0, 1100.0, 1200.0]
+    df = pd.DataFrame({'labels': labels, 'start': starts, 'stop': stops})
+    fast = intervals.merge_play_segments(Timeline.from_labels(labels, starts, stops))
+    assert to_csv(fast) == to_csv(legacy_merge_play_segments(df))
+    # 간격 240초 이상인 play는 합치지 않음 (460 -> 700)
+    assert fast.labels.tolist() == ['play', 'speech', 'play', 'play', 'music', 'play']
+
+
+def test_identified_block_becomes_play():
+    labels = ['speech', 'music', 'speech']
+    tl = Timeline.from_labels(labels, [0.0, 10.0, 40.0], [10.0, 40.0, 50.0])
+    assert intervals.play_segments(tl).labels.tolist() == ['speech', 'music', 'speech']
+    result = intervals.play_segments(tl, identify=lambda block: True)
+    assert result.labels.tolist() == ['speech', 'play', 'speech']
+
+
+def legacy_assign(starts, stops, segments):
+    """merge_mp3.py create_label_csv의 예전 겹침 할당 + 0 채우기."""
+    assigned = []
+    for start, stop in zip(starts, stops):
+        seg_num = 0
+        for s_id, s_start, s_stop in segments:
+            if not (stop <= s_start or start >= s_stop):
+                seg_num = s_id
+                break
+        assigned.append(seg_num)
+    filled = list(assigned)
+    for i in range(len(filled)):
+        if filled[i] == 0:
+            for j in range(i + 1, len(filled)):
+                if filled[j] > 0:
+                    filled[i] = filled[j]
+                    break
+    for i in reversed(range(len(filled))):
+        if filled[i] == 0:
+            for j in reversed(range(i)):
+                if filled[j] > 0:
+                    filled[i] = filled[j]
+                    break
+    return assigned, filled
+
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_assign_first_overlap_matches_legacy(shuffle):
+    rng = np.random.default_rng(3)
+    bounds = np.round(np.cumsum(rng.exponential(5.0, size=401)), 2)
+    starts, stops = bounds[:-1], bounds[1:]
+    tl = Timeline.from_labels(['speech'] * len(starts), starts, stops)
+    # 요약 구간: 일부 행 경계와 정확히 같은 경계, 구간 사이의 빈 곳, 마지막 행보다 먼저 끝남
+    edges = np.sort(rng.choice(bounds[10:-20], size=30, replace=False))
+    segments = [(k + 1, float(edges[2 * k]), float(edges[2 * k + 1])) for k in range(15)]
+    if shuffle:
+        segments = [segments[i] for i in rng.permutation(len(segments))]
+    ids, s_starts, s_stops = zip(*segments)
+
+    expected, expected_filled = legacy_assign(starts.tolist(), stops.tolist(), segments)
+    assigned = intervals.assign_first_overlap(tl, ids, s_starts, s_stops)
+    assert assigned.tolist() == expected
+    assert intervals.fill_unassigned(assigned).tolist() == expected_filled
+
+
+def test_fill_unassigned_edges():
+    assert intervals.fill_unassigned([0, 0, 2, 0, 3, 0]).tolist() == [2, 2, 2, 3, 3, 3]
+    assert intervals.fill_unassigned([0, 0]).tolist() == [0, 0]
@@ -0,0 +1,85 @@
+import numpy as np
+
+from playlist_index import PlaylistIndex
+from timeline import clock_to_ms, duration_to_ms
+
+# 예전 make_piece.py의 playlist 전체 순회 결과와 비교 (예전 구현은 초 단위, 인덱스는 밀리초)
+
+BROADCAST_START = '14:00'
+
+
+def make_playlist(seed=0, songs=40):
+    rng = np.random.default_rng(seed)
+    playlist = []
+    minute = 0
+    for k in range(songs):
+        minute += int(rng.integers(0, 6))
+        song = {'Artist': f"artist{k % 7}", 'Title': f"title{k}", 'Time': f"{14 + minute // 60:02d}:{minute % 60:02d}"}
+        if rng.random() < 0.8:
+            song['Duration'] = f"{int(rng.integers(2, 6))}:{int(rng.integers(0, 60)):02d}"
+        playlist.append(song)
+    # 방송 시작 전 곡과 Time 없는 곡도 섞음
+    playlist.insert(3, {'Artist': 'early', 'Title': 'early', 'Time': '13:58', 'Duration': '3:00'})
+    playlist.insert(10, {'Artist': 'untimed', 'Title': 'untimed'})
+    return playlist
+
+
+def legacy_song_segments(playlist):
+    base = clock_to_ms(BROADCAST_START)
+    segments = []
+    for song in playlist:
+        duration = song.get('Duration') or song.get('DurationSec')
+        if not song.get('Time') or not duration:
+            continue
+        start = clock_to_ms(song['Time']) - base
+        if start >= 0:
+            segments.append((start, start + duration_to_ms(duration)))
+    return segments
+
+
+def legacy_nearest(playlist, start_ms):
+    base = clock_to_ms(BROADCAST_START)
+    best, min_diff = None, float('inf')
+    for song in playlist:
+        if not song.get('Time'):
+            continue
+        diff = abs(start_ms - (clock_to_ms(song['Time']) - base))
+        if diff < min_diff:
+            min_diff, best = diff, song
+    return best
+
+
+def test_overlapping_matches_linear_scan():
+    playlist = make_playlist()
+    index = PlaylistIndex(playlist, clock_to_ms(BROADCAST_START))
+    segments = legacy_song_segments(playlist)
+    rng = np.random.default_rng(1)
+    for start in rng.integers(-60000, 4 * 3600 * 1000, size=500):
+        stop = int(start + rng.integers(0, 600000))
+        expected = [(s, e) for s, e in segments if max(start, s) < min(stop, e)]
+        found = [(s, e) for s, e in index.overlapping(int(start), stop) if max(start, s) < min(stop, e)]
+        assert found == expected
+
+
+def test_nearest_matches_linear_scan():
+    playlist = make_playlist(seed=2)
+    index = PlaylistIndex(playlist, clock_to_ms(BROADCAST_START))
+    base = clock_to_ms(BROADCAST_START)
+    song_times = [clock_to_ms(s['Time']) - base for s in playlist if s.get('Time')]
+    rng = np.random.default_rng(3)
+    # 곡 시각 그 자체와 두 곡 사이 정확히 가운데(거리가 같은 경우)도 확인
+    probes = list(rng.integers(-600000, 4 * 3600 * 1000, size=300)) + song_times
+    probes += [(a + b) // 2 for a, b in zip(song_times, song_times[1:])]
+    for start in probes:
+        assert index.nearest(int(start)) is legacy_nearest(playlist, int(start))
+
+
+def test_next_song_and_seek_after():
+    playlist = [{'Artist': 'a', 'Title': 'x'}, {'Artist': 'b', 'Title': 'y'}, {'Artist': 'c', 'Title': 'z'}]
+    index = PlaylistIndex(playlist, 0)
+    assert index.nearest(0) is None
+    assert index.next_song() is playlist[0]
+    assert index.seek_after('c', 'z') == 2
+    assert index.next_song() is None
+    assert index.seek_after('b', 'y') == 1
+    assert index.next_song() is playlist[2]
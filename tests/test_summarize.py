@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+# summarize.py는 import할 때 Gemini client를 만들므로 google-genai가 있는 환경(summary)에서만 실행
+pytest.importorskip('google.genai')
+pytest.importorskip('dotenv')
+
+from summarize import MAX_PROMPT_LENGTH, SectionCoalescer, coalesce_sections  # noqa: E402
+
+
+def section(i, start, end, transcript, speech_ms):
+    return {
+        'id': i, 'start': start, 'end': end, 'duration_ms': int((end - start) * 1000),
+        'transcript': transcript, 'texts': [transcript], 'music_info': "[없음]", 'remainder': None,
+        'raw_chars': len(transcript), 'removed_chars': 0, 'speech_ms': speech_ms,
+    }
+
+
+def random_sections(seed, count=200):
+    rng = np.random.default_rng(seed)
+    sections = []
+    start = 0.0
+    for i in range(count):
+        end = start + float(rng.integers(5, 600))
+        chars = int(rng.choice([0, 10, 150, 1500, 2900, 3000]))
+        sections.append(section(i + 1, start, end, 'x' * chars, int(rng.integers(0, 120000))))
+        start = end
+    return sections
+
+
+def test_defaults_pass_sections_through():
+    sections = random_sections(0)
+    merged = coalesce_sections([dict(s) for s in sections])
+    assert [(s['start'], s['end'], s['transcript']) for s in merged] == [(s['start'], s['end'], s['transcript']) for s in sections]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_merges_never_exceed_max_length(seed):
+    sections = random_sections(seed)
+    merged = coalesce_sections([dict(s) for s in sections], min_speech_ms=30000, min_chars=200)
+    assert len(merged) < len(sections)
+    assert all(len(s['transcript']) <= MAX_PROMPT_LENGTH for s in merged)
+    # 구간은 시간순으로 빈틈없이 이어지고, ID는 1부터 다시 매김
+    assert [s['id'] for s in merged] == list(range(1, len(merged) + 1))
+    assert merged[0]['start'] == sections[0]['start'] and merged[-1]['end'] == sections[-1]['end']
+    assert all(a['end'] == b['start'] for a, b in zip(merged, merged[1:]))
+    assert sum(len(s['texts']) for s in merged) == len(sections)
+
+
+def test_small_sections_do_not_snowball():
+    # 말이 없는 2900자 music 구간이 이어져도 서로 합치지 않음 (예전에는 하나의 긴 프롬프트가 됨)
+    sections = [section(i + 1, i * 60.0, (i + 1) * 60.0, 'x' * 2900, 0) for i in range(8)]
+    merged = coalesce_sections(sections, min_speech_ms=30000, min_chars=200)
+    assert len(merged) == 8
+
+
+def test_small_section_goes_to_previous_then_next():
+    coalescer = SectionCoalescer(min_speech_ms=30000, min_chars=200, max_length=100)
+    sections = [
+        section(1, 0.0, 60.0, 'a' * 50, 60000),
+        section(2, 60.0, 70.0, 'b' * 10, 1000),   # 앞 구간에 붙음
+        section(3, 70.0, 130.0, 'c' * 90, 60000),
+        section(4, 130.0, 140.0, 'd' * 20, 1000),  # 앞(90자)에는 안 들어가서 다음 구간에 붙음
+        section(5, 140.0, 200.0, 'e' * 60, 60000),
+    ]
+    merged = []
+    for s in sections:
+        merged += coalescer.push(s)
+    merged += coalescer.finish()
+    assert [(s['start'], s['end']) for s in merged] == [(0.0, 70.0), (70.0, 130.0), (130.0, 200.0)]
+    assert [len(s['transcript']) for s in merged] == [61, 90, 81]
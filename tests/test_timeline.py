@@ -0,0 +1,55 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from timeline import SEGMENTS_INFO, Timeline, pandas_float, parse_seconds
+
+
+def frame_times(frames):
+    """ina_speech_segmenter처럼 frame 번호 * 0.02를 반올림 없이 쓴 값의 문자열."""
+    return [repr(float(f) * 0.02) for f in frames]
+
+
+def test_pandas_float_matches_read_csv():
+    texts = frame_times(range(0, 400000, 7)) + ['94.32000000000001', '0.1', '-3.5', '1e-05', '12']
+    expected = pd.read_csv(io.StringIO("value\n" + "\n".join(texts)))['value'].to_numpy()
+    # float()와 pandas가 다른 값이 실제로 섞여 있어야 의미가 있음
+    assert any(float(t) != e for t, e in zip(texts, expected))
+    assert [pandas_float(t) for t in texts] == expected.tolist()
+    assert parse_seconds(texts).tolist() == expected.tolist()
+
+
+def test_read_csv_matches_pandas(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = np.cumsum(rng.integers(0, 500, size=2000))
+    times = frame_times(frames)
+    labels = rng.choice(['speech', 'music', 'noEnergy', 'noise'], size=len(times) - 1)
+    path = tmp_path / 'segments.csv'
+    path.write_text("labels\tstart\tstop\n" + "".join(f"{l}\t{a}\t{b}\n" for l, a, b in zip(labels, times[:-1], times[1:])))
+
+    df = pd.read_csv(path, sep='\t')
+    tl = Timeline.read_csv(path, sep='\t')
+    assert tl.labels.tolist() == df['labels'].tolist()
+    assert tl.start.tolist() == df['start'].tolist()
+    assert tl.stop.tolist() == df['stop'].tolist()
+
+    buf = io.StringIO()
+    tl.write_csv(buf)
+    assert buf.getvalue() == df.to_csv(index=False)
+
+
+def test_read_csv_skips_malformed_rows(tmp_path, capsys):
+    path = tmp_path / 'segments_info.csv'
+    path.write_text(
+        "Id,Start Time,Stop Time,Duration,Type,Transcript\n"
+        "1,0.0,1.5,1.5,speech,hello\n"
+        "2,1.5,oops,1.0,speech,bad time\n"
+        "3,2.5,3.0,0.5,music\n"
+        "x,3.0,4.0,1.0,speech,bad id\n"
+        "5,4.0,6.0,2.0,speech,ok\n"
+    )
+    tl = Timeline.read_csv(path, schema=SEGMENTS_INFO)
+    assert tl.columns['Id'].tolist() == [1, 5]
+    assert tl.start.tolist() == [0.0, 4.0]
+    assert capsys.readouterr().out.count("Skipping malformed row") == 3
@@ -0,0 +1,338 @@
+import csv
+from enum import IntEnum
+
+import numpy as np
+
+# 모든 단계(remove-noenergy, modify-script, make_piece, summarize, merge_mp3)가 공유하는 세그먼트 타임라인.
+# struct-of-arrays 형태로 라벨은 정수 코드, 시간은 CSV에서 읽은 초 단위 float64 그대로 저장하고,
+# 비교/조회용으로 정수 밀리초(int64) 배열을 같이 둠. 그 밖의 컬럼(Segment, Id, Transcript 등)은 columns에 컬럼별 배열로 둠.
+# CSV는 기존 파일 형식(초 단위 float, 라벨 문자열) 그대로 읽고 씀. 초 값은 예전 pd.read_csv와 같은 값으로 읽고
+# 반올림 없이 다시 쓰므로 segmenter의 frame*0.02 값(689.5600000000001 등)도 예전 단계와 같은 CSV가 나옴.
+
+
+class Label(IntEnum):
+    SPEECH = 0
+    MUSIC = 1
+    NO_ENERGY = 2
+    NOISE = 3
+    PLAY = 4
+    SILENCE = 5
+
+    @property
+    def text(self):
+        return LABEL_NAMES[self]
+
+
+# Label 코드 순서와 같음. 지문 태그(ad, jingle 등)처럼 목록에 없는 라벨은 타임라인마다 뒤에 추가됨
+LABEL_NAMES = ('speech', 'music', 'noEnergy', 'noise', 'play', 'silence')
+
+# CSV 종류별 컬럼 이름. duration 컬럼은 읽을 때 버리고 쓸 때 stop - start로 다시 계산함
+SEGMENTER = {'label': 'labels', 'start': 'start', 'stop': 'stop'}
+SEGMENTS_INFO = {'label': 'Type', 'start': 'Start Time', 'stop': 'Stop Time', 'duration': 'Duration'}
+
+# 정수로 읽는 컬럼. 나머지는 문자열 그대로 둠
+INT_COLUMNS = ('Id', 'Segment')
+
+
+def to_ms(seconds):
+    return np.round(np.asarray(seconds, dtype=np.float64) * 1000).astype(np.int64)
+
+
+def to_seconds(ms):
+    return np.asarray(ms) / 1000.0
+
+
+def pandas_float(text):
+    """pandas read_csv 기본 변환기(precise_xstrtod)와 같은 float 변환.
+
+    앞 17자리까지를 double로 누적한 뒤 10의 거듭제곱으로 나누므로, 누적 값이 2^53을 넘는 16자리 이상 값은
+    float()와 마지막 비트가 다를 수 있음 (예: '94.32000000000001' -> 94.32).
+    """
+    text = text.strip()
+    if 'e' in text or 'E' in text:
+        return float(text)
+    negative = text.startswith('-')
+    int_part, _, frac = text.lstrip('+-').partition('.')
+    number = 0.0
+    digits = 0
+    exponent = 0
+    for c in int_part:
+        if digits < 17:
+            number = number * 10.0 + int(c)
+            digits += 1
+        else:
+            exponent += 1
+    for c in frac[:max(17 - digits, 0)]:
+        number = number * 10.0 + int(c)
+        exponent -= 1
+    number = number * float(f"1e{exponent}") if exponent > 0 else number / float(f"1e{-exponent}")
+    return -number if negative else number
+
+
+def parse_seconds(texts):
+    """CSV의 초 값 문자열 -> float64. 예전 단계들이 pd.read_csv로 읽던 값과 같게 함.
+
+    15자리 이하 값은 float()와 pandas 결과가 같으므로 한 번에 변환하고, 긴 값(segmenter의 frame*0.02 등)만 따로 계산.
+    """
+    values = np.array(texts, dtype=np.float64)
+    for i, text in enumerate(texts):
+        if len(text) > 15:
+            values[i] = pandas_float(text)
+    return values
+
+
+def clock_to_ms(text):
+    """playlist 'Time' 값 'HH:MM' 또는 'HH:MM:SS' -> 자정 기준 밀리초."""
+    parts = [float(p) for p in str(text).split(':')]
+    hours, minutes, seconds = parts + [0.0] * (3 - len(parts))
+    return int(round((hours * 3600 + minutes * 60 + seconds) * 1000))
+
+
+def duration_to_ms(value):
+    """playlist Duration 값('mm:ss' 또는 초) -> 밀리초. 비어 있으면 None."""
+    if value is None or value == '' or str(value).lower() == 'null':
+        return None
+    if isinstance(value, str) and ':' in value:
+        minutes, seconds = value.split(':')
+        return (int(minutes) * 60 + int(seconds)) * 1000
+    return int(round(float(value) * 1000))
+
+
+class Segment:
+    """타임라인의 한 행을 가리키는 가벼운 레코드 (값을 복사하지 않음)."""
+
+    __slots__ = ('timeline', 'index')
+
+    def __init__(self, timeline, index):
+        self.timeline = timeline
+        self.index = index
+
+    @property
+    def code(self):
+        return int(self.timeline.codes[self.index])
+
+    @property
+    def label(self):
+        return self.timeline.names[self.timeline.codes[self.index]]
+
+    @property
+    def start_ms(self):
+        return int(self.timeline.start_ms[self.index])
+
+    @property
+    def stop_ms(self):
+        return int(self.timeline.stop_ms[self.index])
+
+    @property
+    def start(self):
+        return float(self.timeline.start[self.index])
+
+    @property
+    def stop(self):
+        return float(self.timeline.stop[self.index])
+
+    @property
+    def duration_ms(self):
+        return self.stop_ms - self.start_ms
+
+    @property
+    def duration(self):
+        return self.stop - self.start
+
+    def __getitem__(self, column):
+        return self.timeline.columns[column][self.index]
+
+    def __repr__(self):
+        return f"Segment({self.label}, {self.start:.3f}-{self.stop:.3f})"
+
+
+class Timeline:
+    __slots__ = ('codes', 'start', 'stop', 'start_ms', 'stop_ms', 'names', 'columns')
+
+    def __init__(self, codes, start, stop, names=LABEL_NAMES, columns=None):
+        """start/stop: 초 단위. start_ms/stop_ms는 여기서 계산함."""
+        self.codes = np.asarray(codes, dtype=np.int16)
+        self.start = np.asarray(start, dtype=np.float64)
+        self.stop = np.asarray(stop, dtype=np.float64)
+        self.start_ms = to_ms(self.start)
+        self.stop_ms = to_ms(self.stop)
+        self.names = tuple(names)
+        self.columns = dict(columns or {})
+
+    @classmethod
+    def from_labels(cls, labels, start, stop, columns=None, ms=False):
+        """라벨 문자열과 시작/끝 시간(초, ms=True면 밀리초)으로 생성."""
+        names = list(LABEL_NAMES)
+        labels = np.asarray(labels, dtype=object)
+        if len(labels):
+            unique, inverse = np.unique(labels.astype(str), return_inverse=True)
+            for name in unique:
+                if name not in names:
+                    names.append(name)
+            codes = np.array([names.index(name) for name in unique], dtype=np.int16)[inverse]
+        else:
+            codes = np.zeros(0, dtype=np.int16)
+        if ms:
+            start, stop = to_seconds(start), to_seconds(stop)
+        return cls(codes, start, stop, names, columns)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0), np.zeros(0), np.zeros(0))
+
+    @classmethod
+    def read_csv(cls, path, sep=',', schema=SEGMENTER, encoding='utf-8-sig'):
+        with open(path, 'r', newline='', encoding=encoding) as f:
+            reader = csv.reader(f, delimiter=sep)
+            header = next(reader, None)
+            rows = [row for row in reader if row]
+        if header is None:
+            return cls.empty()
+        for key in ('label', 'start', 'stop'):
+            if schema[key] not in header:
+                raise KeyError(f"Column '{schema[key]}' not found in {path}")
+        rows = cls._valid_rows(path, header, rows, schema)
+        values = dict(zip(header, zip(*rows))) if rows else {name: () for name in header}
+        labels = values.pop(schema['label'])
+        start = parse_seconds(values.pop(schema['start']))
+        stop = parse_seconds(values.pop(schema['stop']))
+        values.pop(schema.get('duration'), None)
+        columns = {}
+        for name, column in values.items():
+            columns[name] = np.array(column, dtype=np.int64) if name in INT_COLUMNS else np.array(column, dtype=object)
+        return cls.from_labels(labels, start, stop, columns)
+
+    @staticmethod
+    def _valid_rows(path, header, rows, schema):
+        """컬럼 수가 header와 다르거나 시간/정수 값을 읽을 수 없는 행은 경고를 출력하고 버림."""
+        numeric = [header.index(schema[key]) for key in ('start', 'stop', 'duration') if schema.get(key) in header]
+        integer = [header.index(name) for name in INT_COLUMNS if name in header]
+        valid = []
+        for number, row in enumerate(rows, start=1):
+            try:
+                if len(row) != len(header):
+                    raise ValueError(f"expected {len(header)} columns, got {len(row)}")
+                for i in numeric:
+                    float(row[i])
+                for i in integer:
+                    int(row[i])
+            except ValueError as e:
+                print(f"Skipping malformed row {number} in {path}: {e}")
+                continue
+            valid.append(row)
+        return valid
+
+    def write_csv(self, path_or_buf, sep=',', schema=SEGMENTER, fieldnames=None):
+        """기존 pandas to_csv(index=False)와 같은 형식으로 씀 (초 단위 float는 repr, 줄바꿈은 '\\n')."""
+        if fieldnames is None:
+            fieldnames = [schema['label'], schema['start'], schema['stop']] + list(self.columns)
+        derived = {
+            schema['label']: self.labels.tolist(),
+            schema['start']: self.start.tolist(),
+            schema['stop']: self.stop.tolist(),
+        }
+        if 'duration' in schema:
+            derived[schema['duration']] = (self.stop - self.start).tolist()
+        data = [derived[name] if name in derived else self.columns[name].tolist() for name in fieldnames]
+        if hasattr(path_or_buf, 'write'):
+            self._write_rows(path_or_buf, sep, fieldnames, data)
+        else:
+            with open(path_or_buf, 'w', newline='', encoding='utf-8') as f:
+                self._write_rows(f, sep, fieldnames, data)
+
+    @staticmethod
+    def _write_rows(f, sep, fieldnames, data):
+        writer = csv.writer(f, delimiter=sep, lineterminator='\n')
+        writer.writerow(fieldnames)
+        writer.writerows(zip(*data))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return Segment(self, int(key) if key >= 0 else len(self) + int(key))
+        return self.take(key)
+
+    def records(self):
+        for i in range(len(self)):
+            yield Segment(self, i)
+
+    def take(self, index):
+        """index: 정수 배열, bool mask, slice."""
+        return Timeline(self.codes[index], self.start[index], self.stop[index], self.names,
+                        {name: column[index] for name, column in self.columns.items()})
+
+    def replace(self, codes=None, start=None, stop=None, names=None, **columns):
+        """일부 배열만 바꾼 새 타임라인 (나머지 배열은 공유). start/stop은 초 단위."""
+        return Timeline(
+            self.codes if codes is None else codes,
+            self.start if start is None else start,
+            self.stop if stop is None else stop,
+            self.names if names is None else names,
+            dict(self.columns, **columns),
+        )
+
+    def with_column(self, name, values):
+        return self.replace(**{name: np.asarray(values)})
+
+    @property
+    def labels(self):
+        return np.array(self.names, dtype=object)[self.codes] if len(self) else np.zeros(0, dtype=object)
+
+    @property
+    def duration_ms(self):
+        return self.stop_ms - self.start_ms
+
+    @property
+    def duration(self):
+        return self.stop - self.start
+
+    def code(self, name):
+        return self.names.index(name) if name in self.names else -1
+
+    def is_label(self, *names):
+        return np.isin(self.codes, [self.code(name) for name in names])
+
+    def relabel(self, mask, name):
+        names = self.names if name in self.names else self.names + (name,)
+        codes = self.codes.copy()
+        codes[mask] = names.index(name)
+        return self.replace(codes=codes, names=names)
+
+    def sorted(self):
+        return self.take(np.argsort(self.start_ms, kind='stable'))
+
+    @classmethod
+    def concat(cls, timelines):
+        names = list(LABEL_NAMES)
+        codes = []
+        for tl in timelines:
+            for name in tl.names:
+                if name not in names:
+                    names.append(name)
+            remap = np.array([names.index(name) for name in tl.names], dtype=np.int16)
+            codes.append(remap[tl.codes])
+        columns = {}
+        for name in (timelines[0].columns if timelines else {}):
+            columns[name] = np.concatenate([tl.columns[name] for tl in timelines])
+        return cls(np.concatenate(codes) if codes else np.zeros(0),
+                   np.concatenate([tl.start for tl in timelines]) if timelines else np.zeros(0),
+                   np.concatenate([tl.stop for tl in timelines]) if timelines else np.zeros(0),
+                   names, columns)
+
+    def overlapping(self, start_ms, stop_ms):
+        """[start_ms, stop_ms)와 겹치는 행 번호. start/stop이 정렬된(겹치지 않는) 타임라인 기준."""
+        lo = np.searchsorted(self.stop_ms, start_ms, side='right')
+        hi = np.searchsorted(self.start_ms, stop_ms, side='left')
+        return np.arange(lo, max(lo, hi))
+
+    def coalesce(self, joins):
+        """joins[i]가 True인 행을 앞 행에 합침. 합친 행은 첫 행의 라벨/컬럼과 마지막 행의 stop을 가짐."""
+        joins = np.array(joins, dtype=bool)
+        if len(self) == 0:
+            return self
+        joins[0] = False
+        heads = np.flatnonzero(~joins)
+        last = np.append(heads[1:], len(self)) - 1
+        return self.take(heads).replace(stop=self.stop[last])
@@ -0,0 +1,23 @@
+import json
+import hashlib
+
+import numpy as np
+
+from sqlite_cache import SqliteCache
+
+
+class TranscriptCache(SqliteCache):
+    """세그먼트 오디오 샘플 + ASR 설정의 해시를 key로 하는 전사 결과 캐시.
+
+    modify-script.py의 임계값만 바꿔서 다시 돌릴 때, 경계가 그대로인 세그먼트는 전사를 건너뜀.
+    """
+
+    def __init__(self, path, settings, max_bytes=None):
+        super().__init__(path, max_bytes=max_bytes)
+        self.settings = json.dumps(settings, sort_keys=True, ensure_ascii=False).encode('utf-8')
+
+    def key(self, samples):
+        """samples: PcmCache.read()가 돌려준 int16 view (복사 없이 해시)."""
+        digest = hashlib.sha256(self.settings)
+        digest.update(np.ascontiguousarray(samples))
+        return digest.hexdigest()
@@ -0,0 +1,73 @@
+import re
+
+# summarize.py에서 Gemini에 보내기 전에 whisper 전사에서 토큰만 쓰는 부분을 지움.
+#  - 라디오 음악/잡음 구간에서 whisper가 만들어내는 유튜브식 문구 ("구독과 좋아요" 등)
+#  - 음표, 추임새 ("음...", "어...")
+#  - condition_on_previous_text False에서 자주 나오는 같은 단어/문장 반복 -> 한 번만 남김
+
+# 이 문구와 문구에 붙은 부탁/인사말만 지움. 같은 문장의 DJ 멘트는 남김
+BOILERPLATE_PHRASES = [
+    r'구독\s*(과|와|,)?\s*좋아요',
+    r'좋아요\s*(와|과|,)?\s*구독',
+    r'알림\s*설정',
+    r'시청\s*해\s*주셔서\s*감사',
+    r'다음\s*영상에서\s*만나',
+    r'자막\s*(제공|제작|by)',
+    r'한글\s*자막(\s*(제공|제작|by))?',
+]
+BOILERPLATE = re.compile('|'.join(BOILERPLATE_PHRASES), re.IGNORECASE)
+# 문구가 끝난 어절의 나머지와 바로 뒤의 부탁/인사 어절 ("구독과 좋아요 부탁드립니다", "시청해주셔서 감사합니다")
+CLAUSE_TAIL = re.compile(r'[^\s.?!]*(?:\s+(?:부탁|눌러|해\s*주|감사|고맙|까지)[^\s.?!]*)*[.?!]*')
+# 음표와 추임새 ("음...", "어..", "아…")
+FILLER = re.compile(r'[♪♩♫♬]+|(?<!\S)(?:음+|어+|아+|으+|흠+)\s*(?:\.{2,}|…)')
+SPACES = re.compile(r'\s+')
+
+MAX_NGRAM = 12
+# n어절 묶음이 연달아 이 횟수 이상 나오면 한 번만 남김. 짧은 묶음은 "네 네"처럼 자연스러운 반복이 있어서 기준을 높임
+MIN_REPEATS_SHORT = 3
+MIN_REPEATS_LONG = 2
+LONG_NGRAM = 4
+
+
+def collapse_repeats(words):
+    """연속으로 반복되는 n-gram(어절 단위)을 한 번만 남김."""
+    out = []
+    i = 0
+    n_words = len(words)
+    while i < n_words:
+        collapsed = False
+        for n in range(min(MAX_NGRAM, (n_words - i) // 2), 0, -1):
+            gram = words[i:i + n]
+            repeats = 1
+            while words[i + repeats * n:i + (repeats + 1) * n] == gram:
+                repeats += 1
+            if repeats >= (MIN_REPEATS_LONG if n >= LONG_NGRAM else MIN_REPEATS_SHORT):
+                out.extend(gram)
+                i += repeats * n
+                collapsed = True
+                break
+        if not collapsed:
+            out.append(words[i])
+            i += 1
+    return out
+
+
+def remove_boilerplate(text):
+    """BOILERPLATE 문구와 거기에 붙은 부탁/인사말만 지움. 앞뒤 문장 내용은 그대로 둠."""
+    pieces = []
+    pos = 0
+    for match in BOILERPLATE.finditer(text):
+        if match.start() < pos:
+            continue
+        pieces.append(text[pos:match.start()])
+        pos = CLAUSE_TAIL.match(text, match.end()).end()
+    pieces.append(text[pos:])
+    return ' '.join(pieces)
+
+
+def filter_transcript(text):
+    """정리된 전사(clean_transcript 결과) -> 상투 문구/추임새/반복을 지운 텍스트."""
+    text = remove_boilerplate(text)
+    text = FILLER.sub(' ', text)
+    words = SPACES.sub(' ', text).strip().split(' ')
+    return ' '.join(collapse_repeats(words)) if words != [''] else ''